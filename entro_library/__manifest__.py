@@ -69,6 +69,7 @@
         'views/library_media_views.xml',
         'views/library_media_category_views.xml',
         'views/library_media_playlist_views.xml',
+        'views/library_media_view_stat_views.xml',
         'views/res_config_settings_views.xml',
         'views/library_dashboard_views.xml',
 
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import media_upload
+from . import borrowing_scan
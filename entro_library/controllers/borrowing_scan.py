@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from odoo import http
+from odoo.http import request
+
+
+class LibraryBorrowingScanController(http.Controller):
+
+    @http.route('/library/borrowing/<int:borrowing_id>/scan', type='json', auth='user')
+    def borrowing_scan(self, borrowing_id, barcodes):
+        """Add the copies of all ``barcodes`` to the borrowing in one round trip,
+        for scanners that buffer a whole stack of books"""
+        borrowing = request.env['library.borrowing'].browse(borrowing_id).exists()
+        if not borrowing:
+            raise request.not_found()
+        results = borrowing.scan_barcodes(barcodes)
+        return {
+            'results': results,
+            'added_count': sum(result['status'] == 'added' for result in results),
+        }
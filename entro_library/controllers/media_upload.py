@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from odoo import http, exceptions
+from odoo.http import request
+
+
+class LibraryMediaUploadController(http.Controller):
+    """Chunked, resumable upload of media files.
+
+    1. ``start`` opens a session (optionally with the SHA1 of the file, in
+       which case content already stored for a media the user can read is
+       attached without uploading).
+    2. The raw bytes are POSTed in order to
+       ``chunk?offset=N&csrf_token=T``; after an interruption ``status``
+       gives the offset to resume from. The chunk route is a plain HTTP
+       POST, so it is CSRF-checked: ``T`` is the token of the session
+       (``odoo.csrf_token`` in the web client, ``request.csrf_token()`` in
+       QWeb). The JSON routes do not need it.
+    3. ``finish`` assembles the file into the filestore and attaches it.
+    """
+
+    def _get_upload(self, token):
+        upload = request.env['library.media.upload'].search([
+            ('token', '=', token),
+            ('create_uid', '=', request.env.uid),
+        ], limit=1)
+        if not upload:
+            raise request.not_found()
+        return upload
+
+    def _upload_values(self, upload):
+        return {
+            'token': upload.token,
+            'state': upload.state,
+            'received_size': upload.received_size,
+            'total_size': upload.total_size,
+            'duplicate_media_ids': upload._get_duplicate_media().ids,
+        }
+
+    @http.route('/library/media/upload/start', type='json', auth='user')
+    def upload_start(self, media_id, filename, size, checksum=None):
+        media = request.env['library.media'].browse(int(media_id)).exists()
+        if not media:
+            raise request.not_found()
+        upload = request.env['library.media.upload']._start(media, filename, int(size), checksum=checksum)
+        return self._upload_values(upload)
+
+    @http.route('/library/media/upload/<string:token>/chunk', type='http', auth='user', methods=['POST'])
+    def upload_chunk(self, token, offset=0, **kwargs):
+        upload = self._get_upload(token)
+        try:
+            upload._write_chunk(int(offset), request.httprequest.stream)
+        except exceptions.UserError as error:
+            return request.make_json_response({
+                'error': str(error),
+                'received_size': upload.received_size,
+            }, status=409)
+        return request.make_json_response(self._upload_values(upload))
+
+    @http.route('/library/media/upload/<string:token>/status', type='json', auth='user')
+    def upload_status(self, token):
+        return self._upload_values(self._get_upload(token))
+
+    @http.route('/library/media/upload/<string:token>/finish', type='json', auth='user')
+    def upload_finish(self, token):
+        upload = self._get_upload(token)
+        upload._finish()
+        return self._upload_values(upload)
@@ -1,3 +1,7 @@
+from . import library_search_mixin
+from . import library_category_tree_mixin
+from . import library_image_variant_mixin
+from . import library_video_thumbnail_mixin
 from . import library_book
 from . import library_book_category
 from . import library_book_quant
@@ -13,12 +17,20 @@ from . import library_series
 from . import library_location
 from . import library_quant_type
 from . import character_mapping
+from . import library_sequence_counter
 from . import library_sequence_mixin
 from . import library_borrowing
 from . import library_borrowing_line
 from . import library_borrowing_quant_line
+from . import library_borrower_loan_counter
+from . import library_book_popularity
 from . import library_reservation
 from . import library_media
+from . import library_media_hit
+from . import library_media_upload
+from . import library_media_job
+from . import library_media_view_stat
+from . import library_recommendation
 from . import library_media_category
 from . import library_media_playlist
 from . import res_partner
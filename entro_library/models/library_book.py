@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, exceptions
+from odoo.tools import SQL
 from datetime import timedelta
 import re
 import unicodedata
@@ -8,10 +9,13 @@ from ..utils.cutter_generator import CutterGenerator
 class LibraryBook(models.Model):
     _name = 'library.book'
     _description = 'Quản lý sách'
-    _inherit = ['image.mixin', 'mail.thread', 'mail.activity.mixin']
+    _inherit = ['image.mixin', 'library.image.variant.mixin', 'mail.thread', 'mail.activity.mixin', 'library.search.mixin']
     _order = 'registration_date desc, name'
     _rec_names_search = ['name', 'author_ids', 'keywords', 'parallel_title', 'author_names']
 
+    # Override search.mixin settings
+    _search_text_fields = ['name', 'author_names', 'keywords', 'parallel_title']
+
     name = fields.Char(string='Tác phẩm (Nhan đề)', required=True, index=True)
     registration_date = fields.Date(
         string='Ngày ĐKTQ', default=fields.Date.today, required=True)
@@ -89,40 +93,43 @@ class LibraryBook(models.Model):
     # Quants (Physical copies)
     quant_ids = fields.One2many(
         'library.book.quant', 'book_id', string='Bản sao vật lý')
+    reservation_ids = fields.One2many(
+        'library.reservation', 'book_id', string='Đặt trước')
     quant_count = fields.Integer(
         string='Số lượng',
         compute='_compute_quantities',
-        compute_sudo=False,
+        store=True,
         help='Tổng số bản sao vật lý của sách này'
     )
     available_quant_count = fields.Integer(
         string='Có sẵn',
         compute='_compute_quantities',
-        compute_sudo=False,
+        store=True,
+        index=True,
         help='Số lượng bản sao đã có số ĐKCB và có sẵn để mượn'
     )
     borrowed_quant_count = fields.Integer(
         string='Đang mượn',
         compute='_compute_quantities',
-        compute_sudo=False,
+        store=True,
         help='Số lượng bản sao đang được mượn'
     )
     total_reservation_count = fields.Integer(
         string='Đặt trước',
         compute='_compute_quantities',
-        compute_sudo=False,
+        store=True,
         help='Tổng số người đang đặt trước sách này'
     )
     can_borrow_quant_count = fields.Integer(
         string='Có thể mượn',
         compute='_compute_quantities',
-        compute_sudo=False,
+        store=True,
         help='Số lượng bản sao có thể mượn về'
     )
     no_borrow_quant_count = fields.Integer(
         string='Đọc tại chỗ',
         compute='_compute_quantities',
-        compute_sudo=False,
+        store=True,
         help='Số lượng bản sao chỉ đọc tại chỗ, không cho mượn về'
     )
 
@@ -161,10 +168,18 @@ class LibraryBook(models.Model):
         help='URL truy cập sách trên website'
     )
 
+    @api.depends(
+        'quant_ids.quantity', 'quant_ids.state', 'quant_ids.registration_number',
+        'quant_ids.can_borrow', 'quant_ids.active',
+        'reservation_ids.state', 'reservation_ids.active',
+    )
     def _compute_quantities(self):
         """
         Compute quantities using _read_group for better performance.
         Similar to Odoo's stock.quant approach for product.product
+
+        The counters are stored: only the books whose quants or reservations
+        changed are recomputed, so views can sort and filter on them.
         """
         # Get total quantity (sum of all quant quantities) grouped by book_id
         quants_sum_data = self.env['library.book.quant']._read_group(
@@ -239,6 +254,31 @@ class LibraryBook(models.Model):
             # Get unique locations
             book.borrow_location_ids = borrowable_quants.mapped('location_id')
 
+    def _get_facet_fields(self):
+        return {
+            'language': 'language_id',
+            'publication_year': 'publication_year',
+            'author': 'author_ids',
+            'availability': 'available_quant_count',
+        }
+
+    def _get_facet_value_sql(self, facet, alias):
+        if facet == 'availability':
+            return SQL(
+                "SELECT CASE WHEN %s > 0 THEN 'available' ELSE 'unavailable' END",
+                SQL.identifier(alias, 'available_quant_count'),
+            )
+        if facet == 'publication_year':
+            # Free text field, only its 4-digit year is used
+            return SQL(r"SELECT substring(%s from '\d{4}')", SQL.identifier(alias, 'publication_year'))
+        return super()._get_facet_value_sql(facet, alias)
+
+    def _parse_facet_value(self, facet, value):
+        # Years are ints, as for the date of the media
+        if facet == 'publication_year':
+            return int(value)
+        return super()._parse_facet_value(facet, value)
+
     def action_view_quants(self):
         """View book's physical copies (quants)"""
         self.ensure_one()
@@ -4,6 +4,7 @@ from odoo import models, fields, api
 
 class LibraryBookCategory(models.Model):
     _name = 'library.book.category'
+    _inherit = ['library.category.tree.mixin']
     _description = 'Nhóm tài nguyên sách'
     _parent_name = 'parent_id'
     _parent_store = True
@@ -101,13 +102,7 @@ class LibraryBookCategory(models.Model):
         """View books in this category (including child categories)"""
         self.ensure_one()
 
-        # Get all child categories recursively
-        all_category_ids = [self.id]
-        if self.child_ids:
-            all_category_ids += self.child_ids.ids
-            # Recursive search for nested children
-            for child in self.child_ids:
-                all_category_ids += child.child_ids.ids
+        all_category_ids = self._get_subtree_ids()
 
         return {
             'name': f'Sách - {self.name}',
@@ -1,18 +1,16 @@
 # -*- coding: utf-8 -*-
 
-import base64
-
 from odoo import _, api, fields, models, tools
 from odoo.exceptions import ValidationError
 from odoo.tools.image import is_image_size_above
 
-from odoo.addons.web_editor.tools import get_video_embed_code, get_video_thumbnail
+from odoo.addons.web_editor.tools import get_video_embed_code
 
 
 class LibraryBookImage(models.Model):
     _name = 'library.book.image'
     _description = "Library Book Image"
-    _inherit = ['image.mixin']
+    _inherit = ['image.mixin', 'library.image.variant.mixin', 'library.video.thumbnail.mixin']
     _order = 'sequence, id'
 
     name = fields.Char(string="Name", required=True)
@@ -47,14 +45,6 @@ class LibraryBookImage(models.Model):
         for image in self:
             image.embed_code = get_video_embed_code(image.video_url) or False
 
-    #=== ONCHANGE METHODS ===#
-
-    @api.onchange('video_url')
-    def _onchange_video_url(self):
-        if not self.image_1920:
-            thumbnail = get_video_thumbnail(self.video_url)
-            self.image_1920 = thumbnail and base64.b64encode(thumbnail) or False
-
     #=== CONSTRAINT METHODS ===#
 
     @api.constrains('video_url')
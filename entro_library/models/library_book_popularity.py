@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import SQL
+from collections import defaultdict
+from datetime import timedelta
+
+# Quant line states meaning the copy actually left the library
+BORROWED_STATES = ('borrowed', 'overdue', 'returned', 'lost')
+
+# Counter field for each ranking period
+POPULARITY_FIELDS = {
+    'all': 'borrow_count',
+    '30d': 'borrow_count_30d',
+    '7d': 'borrow_count_7d',
+}
+
+
+class LibraryBookPopularity(models.Model):
+    """Materialized borrow counters per book.
+
+    Counters are increased when a quant line is confirmed (see
+    ``library.borrowing.quant.line.action_confirm``) so that the homepage and
+    the dashboard read the ranking with an index lookup instead of grouping
+    the whole borrowing history. The rolling windows are re-aligned daily by
+    ``_cron_refresh_windows`` which only scans the last 30 days.
+    """
+
+    _name = 'library.book.popularity'
+    _description = 'Độ phổ biến của sách'
+    _order = 'borrow_count desc, id'
+    _rec_name = 'book_id'
+
+    book_id = fields.Many2one(
+        'library.book',
+        string='Sách',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    borrow_count = fields.Integer(string='Lượt mượn', default=0, index=True)
+    borrow_count_30d = fields.Integer(string='Lượt mượn 30 ngày', default=0, index=True)
+    borrow_count_7d = fields.Integer(string='Lượt mượn 7 ngày', default=0, index=True)
+    last_borrow_date = fields.Date(string='Ngày mượn gần nhất')
+
+    _sql_constraints = [
+        ('book_unique', 'UNIQUE(book_id)', 'Mỗi sách chỉ có một dòng thống kê!'),
+    ]
+
+    def init(self):
+        # Fill the table from the existing history on first install
+        self.env.cr.execute(SQL('SELECT 1 FROM %s LIMIT 1', SQL.identifier(self._table)))
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _window_start(self, days):
+        return fields.Date.today() - timedelta(days=days)
+
+    @api.model
+    def _rebuild(self):
+        """Recompute every counter from the borrowing history"""
+        self.env.flush_all()
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO library_book_popularity (
+                book_id, borrow_count, borrow_count_30d, borrow_count_7d, last_borrow_date,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT ql.book_id,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE b.borrow_date >= %(date_30d)s),
+                   COUNT(*) FILTER (WHERE b.borrow_date >= %(date_7d)s),
+                   MAX(b.borrow_date),
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM library_borrowing_quant_line ql
+              JOIN library_borrowing b ON b.id = ql.borrowing_id
+             WHERE ql.state IN %(states)s
+               AND ql.book_id IS NOT NULL
+          GROUP BY ql.book_id
+            ON CONFLICT (book_id) DO UPDATE
+               SET borrow_count = EXCLUDED.borrow_count,
+                   borrow_count_30d = EXCLUDED.borrow_count_30d,
+                   borrow_count_7d = EXCLUDED.borrow_count_7d,
+                   last_borrow_date = EXCLUDED.last_borrow_date,
+                   write_date = EXCLUDED.write_date
+            """,
+            date_30d=self._window_start(30),
+            date_7d=self._window_start(7),
+            uid=self.env.uid,
+            states=BORROWED_STATES,
+        ))
+        self.invalidate_model()
+
+    @api.model
+    def _add_borrows(self, quant_lines, sign=1):
+        """Increase (or decrease with ``sign=-1``) the counters of the books
+        of ``quant_lines``, one upsert per book"""
+        date_30d = self._window_start(30)
+        date_7d = self._window_start(7)
+        counts = defaultdict(lambda: {'total': 0, '30d': 0, '7d': 0, 'last': None})
+        for quant_line in quant_lines:
+            if not quant_line.book_id:
+                continue
+            borrow_date = quant_line.borrowing_id.borrow_date or fields.Date.today()
+            book_counts = counts[quant_line.book_id.id]
+            book_counts['total'] += sign
+            book_counts['30d'] += sign if borrow_date >= date_30d else 0
+            book_counts['7d'] += sign if borrow_date >= date_7d else 0
+            if sign > 0 and (not book_counts['last'] or borrow_date > book_counts['last']):
+                book_counts['last'] = borrow_date
+
+        for book_id, book_counts in counts.items():
+            self.env.cr.execute(SQL(
+                """
+                INSERT INTO library_book_popularity (
+                    book_id, borrow_count, borrow_count_30d, borrow_count_7d, last_borrow_date,
+                    create_uid, create_date, write_uid, write_date
+                )
+                VALUES (%(book_id)s, GREATEST(%(total)s, 0), GREATEST(%(d30)s, 0), GREATEST(%(d7)s, 0), %(last)s,
+                        %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC')
+                ON CONFLICT (book_id) DO UPDATE
+                   SET borrow_count = GREATEST(library_book_popularity.borrow_count + %(total)s, 0),
+                       borrow_count_30d = GREATEST(library_book_popularity.borrow_count_30d + %(d30)s, 0),
+                       borrow_count_7d = GREATEST(library_book_popularity.borrow_count_7d + %(d7)s, 0),
+                       last_borrow_date = GREATEST(library_book_popularity.last_borrow_date, EXCLUDED.last_borrow_date),
+                       write_date = EXCLUDED.write_date
+                """,
+                book_id=book_id,
+                total=book_counts['total'],
+                d30=book_counts['30d'],
+                d7=book_counts['7d'],
+                last=book_counts['last'],
+                uid=self.env.uid,
+            ))
+        if counts:
+            self.invalidate_model()
+
+    @api.model
+    def _cron_refresh_windows(self):
+        """Re-align the rolling windows, only the last 30 days are scanned"""
+        self.env.flush_all()
+        self.env.cr.execute(SQL(
+            """
+            UPDATE library_book_popularity
+               SET borrow_count_30d = 0, borrow_count_7d = 0
+             WHERE borrow_count_30d != 0 OR borrow_count_7d != 0;
+
+            UPDATE library_book_popularity p
+               SET borrow_count_30d = w.count_30d,
+                   borrow_count_7d = w.count_7d
+              FROM (
+                    SELECT ql.book_id,
+                           COUNT(*) AS count_30d,
+                           COUNT(*) FILTER (WHERE b.borrow_date >= %(date_7d)s) AS count_7d
+                      FROM library_borrowing b
+                      JOIN library_borrowing_quant_line ql ON ql.borrowing_id = b.id
+                     WHERE b.borrow_date >= %(date_30d)s
+                       AND ql.state IN %(states)s
+                  GROUP BY ql.book_id
+                   ) w
+             WHERE p.book_id = w.book_id
+            """,
+            date_30d=self._window_start(30),
+            date_7d=self._window_start(7),
+            states=BORROWED_STATES,
+        ))
+        self.invalidate_model()
+
+    @api.model
+    def _get_popular(self, limit=10, period='all', book_domain=None):
+        """Most borrowed books for ``period`` ('all', '30d' or '7d').
+
+        :param book_domain: extra domain the books must match
+        :return: popularity records ordered from the most borrowed
+        """
+        count_field = POPULARITY_FIELDS.get(period, 'borrow_count')
+        domain = [(count_field, '>', 0)]
+        if book_domain:
+            domain.append(('book_id', 'any', book_domain))
+        return self.search(domain, order=f'{count_field} desc, id', limit=limit)
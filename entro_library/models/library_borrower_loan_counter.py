@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, exceptions
+from odoo.tools import SQL
+from odoo.tools.sql import table_exists
+
+from .library_borrowing_quant_line import ACTIVE_LOAN_STATES
+
+
+class LibraryBorrowerLoanCounter(models.Model):
+    """Number of copies each borrower currently has.
+
+    The counter is moved by ``library.borrowing.quant.line`` whenever a line
+    enters or leaves an active state. The increment is an upsert that keeps
+    the borrower's row locked until the end of the transaction. Odoo
+    transactions run in REPEATABLE READ: when two desks check out books for
+    the same borrower, the second upsert waits for the first transaction and
+    then fails with a serialization error instead of reading its count.
+
+    The limit therefore holds only because the failed transaction is
+    retried from the start, where it sees the committed count: the HTTP
+    layer does it for every request. Code running outside a request (cron,
+    script, shell) must do the same, e.g. with
+    ``odoo.service.model.retrying``, or it gets the error.
+    """
+
+    _name = 'library.borrower.loan.counter'
+    _description = 'Số sách đang mượn của độc giả'
+    _rec_name = 'partner_id'
+    _log_access = False
+
+    partner_id = fields.Many2one('res.partner', string='Người mượn', required=True, ondelete='cascade')
+    active_count = fields.Integer(string='Đang mượn', default=0)
+
+    _sql_constraints = [
+        ('partner_unique', 'UNIQUE(partner_id)', 'Mỗi độc giả chỉ có một bộ đếm!'),
+    ]
+
+    def init(self):
+        # Fill the table from the existing loans when the model is added to an
+        # installed module. On a new database the quant lines are not created
+        # yet, and there is no loan to count anyway.
+        if not table_exists(self.env.cr, 'library_borrowing_quant_line'):
+            return
+        self.env.cr.execute(SQL('SELECT 1 FROM %s LIMIT 1', SQL.identifier(self._table)))
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _get_max_books(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param('library.max_books_per_borrower', default=5))
+
+    @api.model
+    def _get_active_count(self, partner):
+        return self.search([('partner_id', '=', partner.id)], limit=1).active_count
+
+    @api.model
+    def _apply_deltas(self, deltas):
+        """Move the counters by ``deltas`` ({partner_id: delta}) and check the
+        limit of the borrowers whose count increased
+
+        Raises ``psycopg2.errors.SerializationFailure`` when a concurrent
+        transaction moved the same counter, the caller's transaction must be
+        retried (see the class docstring).
+        """
+        counts = {}
+        # Always lock the rows in the same order to avoid deadlocks
+        for partner_id, delta in sorted(deltas.items()):
+            if not partner_id or not delta:
+                continue
+            [(counts[partner_id],)] = self.env.execute_query(SQL(
+                """
+                INSERT INTO library_borrower_loan_counter (partner_id, active_count)
+                VALUES (%(partner_id)s, GREATEST(%(delta)s, 0))
+                ON CONFLICT (partner_id) DO UPDATE
+                   SET active_count = GREATEST(library_borrower_loan_counter.active_count + %(delta)s, 0)
+                RETURNING active_count
+                """,
+                partner_id=partner_id,
+                delta=delta,
+            ))
+        if counts:
+            self.invalidate_model()
+
+        max_books = self._get_max_books()
+        for partner_id, count in counts.items():
+            if deltas[partner_id] > 0 and count > max_books:
+                raise exceptions.ValidationError(
+                    f'Người mượn đã đạt giới hạn {max_books} quyển sách. Hiện tại: {count} quyển.'
+                )
+
+    @api.model
+    def _rebuild(self):
+        """Recompute every counter from the quant lines"""
+        self.env.flush_all()
+        self.env.cr.execute(SQL(
+            """
+            UPDATE library_borrower_loan_counter SET active_count = 0 WHERE active_count != 0;
+
+            INSERT INTO library_borrower_loan_counter (partner_id, active_count)
+            SELECT borrower_id, COUNT(*)
+              FROM library_borrowing_quant_line
+             WHERE state IN %(states)s AND borrower_id IS NOT NULL
+          GROUP BY borrower_id
+            ON CONFLICT (partner_id) DO UPDATE SET active_count = EXCLUDED.active_count
+            """,
+            states=ACTIVE_LOAN_STATES,
+        ))
+        self.invalidate_model()
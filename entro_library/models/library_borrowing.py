@@ -7,9 +7,24 @@ import qrcode
 import io
 import base64
 import logging
+import threading
 
 _logger = logging.getLogger(__name__)
 
+# Overdue quant lines handled per transaction by the overdue cron, and
+# transactions per run before the cron hands over to its next run
+OVERDUE_BATCH_SIZE = 500
+OVERDUE_BATCHES_PER_RUN = 20
+
+# Warning title shown for each rejected scan status
+SCAN_ERROR_TITLES = {
+    'invalid_state': 'Trạng thái không hợp lệ',
+    'not_found': 'Không tìm thấy',
+    'unavailable': 'Không tìm thấy',
+    'duplicate': 'Đã tồn tại',
+    'limit': 'Vượt giới hạn',
+}
+
 
 class LibraryBorrowing(models.Model):
     _name = 'library.borrowing'
@@ -22,6 +37,7 @@ class LibraryBorrowing(models.Model):
     _sequence_field = "name"
     _sequence_date_field = "borrow_date"
     _sequence_index = False
+    _sequence_allocator = 'counter'
 
     name = fields.Char(
         string='Mã phiếu mượn',
@@ -194,6 +210,7 @@ class LibraryBorrowing(models.Model):
         """Compute name based on state - similar to account.move"""
         self = self.sorted(lambda m: m.borrow_date)
 
+        to_number = []
         for record in self:
             # Skip cancelled records
             if record.state == 'cancelled':
@@ -208,8 +225,10 @@ class LibraryBorrowing(models.Model):
 
             # Assign sequence when confirmed (not draft or cancelled)
             if record.borrow_date and not has_name and record.state not in ('draft', 'cancelled'):
-                record._set_next_sequence()
+                to_number.append(record)
 
+        # Number all the confirmed records at once, grouped by period
+        self.browse().concat(*to_number)._set_next_sequences()
         self._inverse_name()
 
     def _inverse_name(self):
@@ -328,74 +347,19 @@ class LibraryBorrowing(models.Model):
 
     @api.constrains('borrower_id', 'borrowing_line_ids')
     def _check_borrowing_constraints(self):
-        """Check borrower's total book limit and resource-based limits"""
+        """Check borrower's total book limit from the active-loan counter"""
+        Counter = self.env['library.borrower.loan.counter'].sudo()
+        max_books = Counter._get_max_books()
         for record in self:
             if record.state == 'draft':
                 continue
 
-            # Check borrower's current borrowing limit (global)
-            config = self.env['ir.config_parameter'].sudo()
-            max_books = int(config.get_param(
-                'library.max_books_per_borrower', default=5))
-
-            # Count books in current borrowing lines
-            current_line_count = len(record.borrowing_line_ids.filtered(
-                lambda l: l.state in ('borrowed', 'overdue')
-            ))
-
-            # Count books in other borrowings
-            other_borrowings = self.search([
-                ('borrower_id', '=', record.borrower_id.id),
-                ('state', 'in', ('borrowed', 'overdue')),
-                ('id', '!=', record.id)
-            ])
-            other_book_count = sum(len(b.borrowing_line_ids.filtered(
-                lambda l: l.state in ('borrowed', 'overdue')
-            )) for b in other_borrowings)
-
-            total_books = current_line_count + other_book_count
-
+            total_books = Counter._get_active_count(record.borrower_id)
             if total_books > max_books:
                 raise exceptions.ValidationError(
                     f'Người mượn đã đạt giới hạn {max_books} quyển sách. Hiện tại: {total_books} quyển.'
                 )
 
-            # Check resource-based limits for each book in borrowing
-            resource_book_count = {}  # Track books per resource
-            for line in record.borrowing_line_ids.filtered(lambda l: l.state in ('borrowed', 'overdue')):
-                # Get resources for this book via quant location
-                if line.quant_id and line.quant_id.location_id and line.quant_id.location_id.resource_id:
-                    resource = line.quant_id.location_id.resource_id
-
-                    # Initialize counter for this resource
-                    if resource.id not in resource_book_count:
-                        resource_book_count[resource.id] = {
-                            'resource': resource,
-                            'count': 0
-                        }
-
-                    resource_book_count[resource.id]['count'] += 1
-
-            # Validate against each resource's limit
-            for resource_id, data in resource_book_count.items():
-                resource = data['resource']
-                current_count_in_borrowing = data['count']
-
-                # Get current borrowed count from other borrowings for this resource
-                can_borrow, message, current_count_other = resource.check_borrowing_limit(
-                    record.borrower_id.id,
-                    book_id=None,
-                    exclude_borrowing_id=record.id
-                )
-
-                total_from_resource = current_count_in_borrowing + current_count_other
-
-                if total_from_resource > resource.max_books_per_borrower:
-                    raise exceptions.ValidationError(
-                        f'Vượt quá giới hạn của tài nguyên "{resource.name}": '
-                        f'{total_from_resource}/{resource.max_books_per_borrower} quyển.'
-                    )
-
     def action_confirm(self):
         """Xác nhận phiếu mượn"""
         for record in self:
@@ -565,33 +529,56 @@ class LibraryBorrowing(models.Model):
             template.send_mail(self.id, force_send=True)
 
     def _send_overdue_email(self):
-        """Send overdue notification email"""
+        """Queue overdue notification email, sent by the mail queue cron"""
         self.ensure_one()
         template = self.env.ref(
             'entro_library.email_template_overdue_notification', raise_if_not_found=False)
         if template:
-            template.send_mail(self.id, force_send=True)
+            template.send_mail(self.id)
 
     @api.model
-    def _cron_update_overdue_status(self):
-        """Scheduled action to update overdue quant lines"""
+    def _cron_update_overdue_status(self, batch_size=OVERDUE_BATCH_SIZE, batch_count=OVERDUE_BATCHES_PER_RUN):
+        """Scheduled action to update overdue quant lines
+
+        Lines are marked overdue by batches of about ``batch_size``, each batch being
+        committed together with the notification emails it queues. A run
+        stopped midway loses at most its current batch: the lines already
+        marked are no longer 'borrowed' and the next run goes on with the
+        others. The progress is reported to the cron, which runs again while
+        lines are left.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
         today = fields.Date.today()
-
-        # Update overdue QUANT lines (not book lines)
         QuantLine = self.env['library.borrowing.quant.line']
-        overdue_quant_lines = QuantLine.search([
+        domain = [
             ('state', '=', 'borrowed'),
             ('due_date', '<', today)
-        ])
-        overdue_quant_lines.write({'state': 'overdue'})
+        ]
+
+        done = 0
+        for _index in range(batch_count):
+            # Whole borrowings per batch, so each one is notified once
+            borrowings = QuantLine.search(domain, order='borrowing_id, id', limit=batch_size).borrowing_id
+            if not borrowings:
+                break
+            # Update overdue QUANT lines (not book lines)
+            overdue_quant_lines = QuantLine.search(domain + [('borrowing_id', 'in', borrowings.ids)])
+            overdue_quant_lines.write({'state': 'overdue'})
+
+            # Queue overdue notification (borrowing and line states will be computed automatically)
+            borrowings_to_notify = overdue_quant_lines.mapped('borrowing_id').filtered(
+                lambda b: b.state == 'overdue'
+            )
+            for borrowing in borrowings_to_notify:
+                if borrowing.borrower_email:
+                    borrowing._send_overdue_email()
 
-        # Send overdue notification (borrowing and line states will be computed automatically)
-        borrowings_to_notify = overdue_quant_lines.mapped('borrowing_id').filtered(
-            lambda b: b.state == 'overdue'
-        )
-        for borrowing in borrowings_to_notify:
-            if borrowing.borrower_email:
-                borrowing._send_overdue_email()
+            done += len(overdue_quant_lines)
+            self.env['ir.cron']._notify_progress(done=done, remaining=QuantLine.search_count(domain))
+            if auto_commit:
+                self.env.cr.commit()
+            # Free the cache of the committed batch
+            self.env.invalidate_all()
 
     @api.model
     def _cron_send_due_reminders(self):
@@ -620,94 +607,124 @@ class LibraryBorrowing(models.Model):
         Handle barcode scanning event - adds quant to borrowing
         Supports two-layer structure: finds or creates book line, then adds quant line
         """
-        # Validate borrowing state first
-        if self.state not in ('draft',):
+        result = self.scan_barcodes([barcode])[0]
+        if result['status'] != 'added':
             return {
                 'warning': {
-                    'title': 'Trạng thái không hợp lệ',
-                    'message': f'Không thể thêm sách vào phiếu mượn ở trạng thái "{dict(self._fields["state"].selection)[self.state]}".'
+                    'title': SCAN_ERROR_TITLES[result['status']],
+                    'message': result['message'],
                 }
             }
 
-        # Search for quant with matching registration_number
-        quant = self.env['library.book.quant'].search([
-            ('registration_number', '=', barcode),
-            ('state', '=', 'available'),
-            ('can_borrow', '=', True)
-        ], limit=1)
-
-        if not quant:
-            return {
-                'warning': {
-                    'title': 'Không tìm thấy',
-                    'message': f'Không tìm thấy sách có số ĐKCB "{barcode}" hoặc sách không khả dụng để mượn.'
-                }
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Thành công',
+                'message': result['message'],
+                'type': 'success',
+                'sticky': False,
             }
+        }
 
-        # Check if quant already exists in current borrowing (excluding cancelled)
-        existing_quant_line = self.env['library.borrowing.quant.line'].search([
-            ('borrowing_id', '=', self.id),
-            ('quant_id', '=', quant.id),
-            ('state', '!=', 'cancelled')
-        ], limit=1)
-
-        if existing_quant_line:
-            return {
-                'warning': {
-                    'title': 'Đã tồn tại',
-                    'message': f'Sách [{quant.registration_number}] "{quant.book_id.name}" đã có trong danh sách.'
-                }
-            }
+    def scan_barcodes(self, barcodes):
+        """
+        Thêm nhiều bản sao vào phiếu mượn theo số ĐKCB trong một lần gọi
 
-        # Calculate default due date from borrowing's due_date
-        due_date = self.due_date
+        All the registration numbers are resolved with one query, the limit is
+        checked once for the whole batch and the missing book lines and the
+        quant lines are created with one ``create`` each.
 
-        # Find or create book line for this book
-        book_line = self.borrowing_line_ids.filtered(
-            lambda l: l.book_id.id == quant.book_id.id and l.state != 'cancelled'
+        :param barcodes: registration numbers in scan order
+        :return: one dict per barcode with ``barcode``, ``status`` ('added',
+            'invalid_state', 'not_found', 'unavailable', 'duplicate' or
+            'limit'), ``message`` and, when found, ``quant_id`` and ``book_id``
+        """
+        self.ensure_one()
+        barcodes = [str(barcode).strip() for barcode in barcodes or []]
+
+        if self.state != 'draft':
+            state_label = dict(self._fields['state'].selection)[self.state]
+            return [{
+                'barcode': barcode,
+                'status': 'invalid_state',
+                'message': f'Không thể thêm sách vào phiếu mượn ở trạng thái "{state_label}".',
+            } for barcode in barcodes]
+
+        quants = self.env['library.book.quant'].search_fetch(
+            [('registration_number', 'in', [barcode for barcode in barcodes if barcode])],
+            ['registration_number', 'state', 'can_borrow', 'book_id'],
         )
+        quant_by_number = {quant.registration_number: quant for quant in quants}
+        QuantLine = self.env['library.borrowing.quant.line']
+        scanned_quant_ids = set(QuantLine.search([
+            ('borrowing_id', '=', self.id),
+            ('quant_id', 'in', quants.ids),
+            ('state', '!=', 'cancelled'),
+        ]).quant_id.ids)
+
+        # Books the borrower may still add: limit minus the copies already
+        # borrowed and the copies already in this borrowing
+        Counter = self.env['library.borrower.loan.counter'].sudo()
+        max_books = Counter._get_max_books()
+        remaining = max_books - Counter._get_active_count(self.borrower_id) - QuantLine.search_count([
+            ('borrowing_id', '=', self.id),
+            ('state', '=', 'draft'),
+        ])
 
-        if not book_line:
-            # Create new book line with initial requested_quantity = 1
-            book_line = self.env['library.borrowing.line'].create({
+        results = []
+        accepted = []
+        for barcode in barcodes:
+            result = {'barcode': barcode}
+            results.append(result)
+            quant = quant_by_number.get(barcode)
+            if quant:
+                result.update(quant_id=quant.id, book_id=quant.book_id.id)
+            if not quant or quant.state != 'available' or not quant.can_borrow:
+                result.update(
+                    status='not_found' if not quant else 'unavailable',
+                    message=f'Không tìm thấy sách có số ĐKCB "{barcode}" hoặc sách không khả dụng để mượn.',
+                )
+            elif quant.id in scanned_quant_ids:
+                result.update(
+                    status='duplicate',
+                    message=f'Sách [{quant.registration_number}] "{quant.book_id.name}" đã có trong danh sách.',
+                )
+            elif remaining <= 0:
+                result.update(
+                    status='limit',
+                    message=f'Người mượn đã đạt giới hạn {max_books} quyển sách.',
+                )
+            else:
+                result.update(
+                    status='added',
+                    message=f'Đã thêm [{quant.registration_number}] "{quant.book_id.name}"',
+                )
+                scanned_quant_ids.add(quant.id)
+                remaining -= 1
+                accepted.append(quant)
+
+        if accepted:
+            # Find or create the book line of each book
+            book_lines = {}
+            for line in self.borrowing_line_ids:
+                if line.state != 'cancelled':
+                    book_lines.setdefault(line.book_id.id, line)
+            new_book_ids = list(dict.fromkeys(
+                quant.book_id.id for quant in accepted if quant.book_id.id not in book_lines
+            ))
+            new_lines = self.env['library.borrowing.line'].create([{
                 'borrowing_id': self.id,
-                'book_id': quant.book_id.id,
+                'book_id': book_id,
                 'requested_quantity': 1,
-            })
-        else:
-            book_line = book_line[0]
-            # Don't increment requested_quantity - just add the quant line
+            } for book_id in new_book_ids])
+            book_lines.update(zip(new_book_ids, new_lines))
 
-        # Add quant line under the book line
-        try:
-            self.env['library.borrowing.quant.line'].create({
-                'line_id': book_line.id,
+            QuantLine.create([{
+                'line_id': book_lines[quant.book_id.id].id,
                 'quant_id': quant.id,
-                'due_date': due_date,
-                'state': 'draft'
-            })
-        except Exception as e:
-            # Rollback book line creation if quant line creation fails
-            if not book_line.quant_line_ids:
-                book_line.unlink()
-
-            # Return error message
-            _logger.error(f"Failed to create quant line for barcode {barcode}: {e}")
+                'due_date': self.due_date,
+                'state': 'draft',
+            } for quant in accepted])
 
-            return {
-                'warning': {
-                    'title': 'Lỗi',
-                    'message': f'Không thể thêm sách: {str(e)}'
-                }
-            }
-
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'Thành công',
-                'message': f'Đã thêm [{quant.registration_number}] "{quant.book_id.name}"',
-                'type': 'success',
-                'sticky': False,
-            }
-        }
+        return results
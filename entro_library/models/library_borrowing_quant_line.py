@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, exceptions
 from datetime import timedelta
+from collections import defaultdict
+
+# Quant line states counting as a book in the borrower's hands
+ACTIVE_LOAN_STATES = ('borrowed', 'overdue')
 
 
 class LibraryBorrowingQuantLine(models.Model):
@@ -100,6 +104,34 @@ class LibraryBorrowingQuantLine(models.Model):
          'Bản sao này đã có trong phiếu mượn!'),
     ]
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['library.borrower.loan.counter']._apply_deltas(lines._get_loan_deltas())
+        return lines
+
+    def write(self, vals):
+        if 'state' not in vals and 'line_id' not in vals:
+            return super().write(vals)
+        deltas = self._get_loan_deltas(sign=-1)
+        res = super().write(vals)
+        for partner_id, delta in self._get_loan_deltas().items():
+            deltas[partner_id] += delta
+        self.env['library.borrower.loan.counter']._apply_deltas(deltas)
+        return res
+
+    def unlink(self):
+        self.env['library.borrower.loan.counter']._apply_deltas(self._get_loan_deltas(sign=-1))
+        return super().unlink()
+
+    def _get_loan_deltas(self, sign=1):
+        """Active copies of ``self`` per borrower, times ``sign``"""
+        deltas = defaultdict(int)
+        for line in self:
+            if line.state in ACTIVE_LOAN_STATES:
+                deltas[line.borrower_id.id] += sign
+        return deltas
+
     @api.depends('due_date', 'return_date', 'state')
     def _compute_late_info(self):
         today = fields.Date.today()
@@ -149,6 +181,7 @@ class LibraryBorrowingQuantLine(models.Model):
 
     def action_confirm(self):
         """Confirm borrowing for this quant"""
+        confirmed = self.browse()
         for line in self:
             if line.state != 'draft':
                 continue
@@ -158,6 +191,10 @@ class LibraryBorrowingQuantLine(models.Model):
                 'state': 'borrowed',
                 'current_borrowing_id': line.borrowing_id.id
             })
+            confirmed |= line
+
+        # Keep the materialized popularity ranking up to date
+        self.env['library.book.popularity'].sudo()._add_borrows(confirmed)
 
     def action_return(self):
         """Return this specific quant"""
@@ -188,6 +225,11 @@ class LibraryBorrowingQuantLine(models.Model):
 
     def action_cancel(self):
         """Cancel this quant line"""
+        # The borrows undone here will be counted again if the borrowing is
+        # set back to draft and confirmed again
+        self.env['library.book.popularity'].sudo()._add_borrows(
+            self.filtered(lambda l: l.state in ACTIVE_LOAN_STATES), sign=-1,
+        )
         for line in self:
             if line.state == 'borrowed':
                 line.quant_id.write({
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models, tools
+
+from ..utils.cache_generation import bump_cache_generation, ensure_cache_generation, get_cache_generation
+
+
+class LibraryCategoryTreeMixin(models.AbstractModel):
+    """Cached category tree lookups for hierarchical (``_parent_store``) categories.
+
+    Resolving a category and its descendants goes through the indexed
+    ``parent_path`` column with a single prefix query, at any depth. Slug
+    resolutions are cached per generation of the tree, each category write
+    moves the tree to a new generation.
+    """
+
+    _name = 'library.category.tree.mixin'
+    _description = 'Cây danh mục'
+
+    def init(self):
+        super().init()
+        if not self._abstract:
+            ensure_cache_generation(self.env.cr, self._get_tree_cache_generation_name())
+
+    @api.model
+    def _get_tree_cache_generation_name(self):
+        return f'{self._table}_tree_generation'
+
+    @api.model
+    def _get_slug_subtree_ids(self, parent_slug, child_slug=None):
+        """Resolve a website slug to its category and descendant ids.
+
+        :param parent_slug: slug of the root category
+        :param child_slug: slug of a direct child of ``parent_slug``, if any
+        :return tuple(category_id, subtree_ids): ``(False, ())`` if not found
+        """
+        generation = get_cache_generation(self.env.cr, self._get_tree_cache_generation_name())
+        return self._get_slug_subtree_ids_cached(parent_slug or '', child_slug or '', generation)
+
+    @tools.ormcache('parent_slug', 'child_slug', 'generation')
+    def _get_slug_subtree_ids_cached(self, parent_slug, child_slug, generation):
+        Category = self.sudo()
+        if child_slug:
+            category = Category.search([
+                ('slug', '=', child_slug),
+                ('parent_id.slug', '=', parent_slug)
+            ], limit=1)
+        elif parent_slug:
+            category = Category.search([
+                ('slug', '=', parent_slug),
+                ('parent_id', '=', False)
+            ], limit=1)
+        else:
+            category = Category
+        if not category:
+            return False, ()
+        return category.id, tuple(category._get_subtree_ids())
+
+    def _get_subtree_ids(self):
+        """Ids of the categories in ``self`` and all their descendants"""
+        if not self:
+            return []
+        domain = ['|'] * (len(self) - 1)
+        for parent_path in self.mapped('parent_path'):
+            domain.append(('parent_path', '=like', f'{parent_path}%'))
+        return self.search(domain).ids
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        bump_cache_generation(self.env, self._get_tree_cache_generation_name())
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        bump_cache_generation(self.env, self._get_tree_cache_generation_name())
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        bump_cache_generation(self.env, self._get_tree_cache_generation_name())
+        return res
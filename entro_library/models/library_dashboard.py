@@ -122,32 +122,21 @@ class LibraryDashboard(models.Model):
         }
 
     def _get_popular_books(self, limit=5):
-        """Get most borrowed books - calculate from borrowing lines"""
-        query = """
-            SELECT
-                b.id,
-                b.name,
-                COUNT(bl.id) as times_borrowed
-            FROM library_book b
-            JOIN library_borrowing_line bl ON bl.book_id = b.id
-            WHERE b.active = true
-            GROUP BY b.id, b.name
-            HAVING COUNT(bl.id) > 0
-            ORDER BY times_borrowed DESC
-            LIMIT %s
-        """
-        self.env.cr.execute(query, (limit,))
-        results = self.env.cr.dictfetchall()
+        """Get most borrowed books - read from the materialized popularity ranking"""
+        popularity = self.env['library.book.popularity'].sudo()._get_popular(
+            limit=limit,
+            book_domain=[('active', '=', True)],
+        )
 
         # Get additional book details
         popular_books = []
-        for result in results:
-            book = self.env['library.book'].sudo().browse(result['id'])
+        for record in popularity:
+            book = record.book_id
             popular_books.append({
                 'id': book.id,
                 'name': book.name,
                 'author': ', '.join(book.author_ids.mapped('name')[:2]) if book.author_ids else 'N/A',
-                'times_borrowed': result['times_borrowed'],
+                'times_borrowed': record.borrow_count,
                 'quant_count': book.quant_count,
                 'available_count': book.available_quant_count,
             })
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import io
+import logging
+
+from PIL import Image, features
+
+from odoo import models, fields, api
+from odoo.tools.image import base64_to_image, image_fix_orientation
+
+_logger = logging.getLogger(__name__)
+
+# Derived images generated from ``image_1920``: field name -> longest side in pixels
+IMAGE_VARIANT_SIZES = {
+    'image_thumb_webp': 128,
+    'image_card_webp': 400,
+    'image_large_webp': 1024,
+}
+IMAGE_VARIANT_QUALITY = 80
+
+
+def _image_to_webp(image_base64, size):
+    """Ảnh ``image_base64`` thu nhỏ về cạnh dài ``size``, mã hóa WebP (base64)"""
+    image = image_fix_orientation(base64_to_image(image_base64))
+    image.thumbnail((size, size), Image.LANCZOS)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    output = io.BytesIO()
+    image.save(output, format='WEBP', quality=IMAGE_VARIANT_QUALITY, method=4)
+    return base64.b64encode(output.getvalue())
+
+
+class LibraryImageVariantMixin(models.AbstractModel):
+    """WebP variants of ``image_1920`` at the sizes used by the website.
+
+    The variants are generated once when the image is written and stored as
+    attachments. ``image_variant_unique`` changes with the content, so the
+    URLs from ``_get_image_variant_url`` can be cached by browsers forever
+    (``/web/image`` answers ``Cache-Control: immutable`` when ``unique`` is
+    given). Inheriting models must also inherit ``image.mixin``.
+    """
+
+    _name = 'library.image.variant.mixin'
+    _description = 'Ảnh WebP dựng sẵn'
+
+    image_thumb_webp = fields.Binary(string='Ảnh nhỏ (WebP)', attachment=True,
+                                     compute='_compute_image_variants', store=True)
+    image_card_webp = fields.Binary(string='Ảnh thẻ (WebP)', attachment=True,
+                                    compute='_compute_image_variants', store=True)
+    image_large_webp = fields.Binary(string='Ảnh lớn (WebP)', attachment=True,
+                                     compute='_compute_image_variants', store=True)
+    image_variant_unique = fields.Char(string='Phiên bản ảnh', compute='_compute_image_variants', store=True)
+
+    @api.depends('image_1920')
+    def _compute_image_variants(self):
+        webp_supported = features.check('webp')
+        for record in self:
+            variants = dict.fromkeys(IMAGE_VARIANT_SIZES, False)
+            if record.image_1920 and webp_supported:
+                try:
+                    variants = {
+                        fname: _image_to_webp(record.image_1920, size)
+                        for fname, size in IMAGE_VARIANT_SIZES.items()
+                    }
+                except Exception:
+                    # SVG and other formats Pillow cannot open keep the original images
+                    _logger.info("Cannot generate WebP variants for %s", record, exc_info=True)
+                    variants = dict.fromkeys(IMAGE_VARIANT_SIZES, False)
+            record.update(variants)
+            record.image_variant_unique = variants['image_card_webp'] and \
+                hashlib.sha1(variants['image_large_webp']).hexdigest()[:16]
+
+    def _get_image_variant_url(self, variant, fallback='image_512'):
+        """URL bất biến của ảnh ``variant``, hoặc của ảnh gốc ``fallback`` nếu chưa có
+
+        :param variant: 'thumb', 'card' or 'large'
+        """
+        self.ensure_one()
+        if self.image_variant_unique:
+            return f'/web/image/{self._name}/{self.id}/image_{variant}_webp?unique={self.image_variant_unique}'
+        return f'/web/image/{self._name}/{self.id}/{fallback}'
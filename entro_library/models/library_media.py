@@ -1,16 +1,39 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, exceptions
+from odoo.tools import SQL
+import hashlib
 import mimetypes
-import base64
+import os
+import re
+import shutil
+
+# Video ID in the supported platform URLs
+YOUTUBE_ID_PATTERNS = (
+    re.compile(r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\s]+)'),
+    re.compile(r'youtube\.com\/embed\/([^&\s]+)'),
+)
+VIMEO_ID_PATTERN = re.compile(r'vimeo\.com\/(\d+)')
+VIDEO_EMBED_URLS = {
+    'youtube': 'https://www.youtube.com/embed/%s',
+    'vimeo': 'https://player.vimeo.com/video/%s',
+}
 
 
 class LibraryMedia(models.Model):
     _name = 'library.media'
     _description = 'Phương tiện thư viện'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'library.search.mixin', 'library.video.thumbnail.mixin']
     _order = 'create_date desc, name'
     _rec_names_search = ['name', 'author', 'keywords', 'description']
 
+    # Override search.mixin settings
+    _search_text_fields = ['name', 'author', 'keywords', 'description']
+    _search_text_html_fields = ['description']
+
+    # Override video.thumbnail.mixin settings
+    _video_url_field = 'file_url'
+    _video_thumbnail_field = 'thumbnail'
+
     name = fields.Char(string='Tiêu đề', required=True, tracking=True, index=True)
 
     # Media Type and Storage
@@ -31,12 +54,36 @@ class LibraryMedia(models.Model):
     filename = fields.Char(string='Tên tệp')
     file_size = fields.Float(string='Kích thước (MB)', compute='_compute_file_info', store=True)
     mime_type = fields.Char(string='Định dạng', compute='_compute_file_info', store=True)
+    file_checksum = fields.Char(
+        string='Mã băm tệp',
+        compute='_compute_file_info',
+        store=True,
+        index=True,
+        copy=False,
+        help='SHA1 của nội dung tệp, lấy từ tệp đính kèm'
+    )
 
     # URL Storage
     file_url = fields.Char(string='Liên kết URL', help='YouTube, Vimeo, hoặc URL trực tiếp')
+    video_provider = fields.Selection([
+        ('youtube', 'YouTube'),
+        ('vimeo', 'Vimeo'),
+    ], string='Nền tảng video', compute='_compute_video_info', store=True)
+    video_id = fields.Char(string='Mã video', compute='_compute_video_info', store=True)
+    video_embed_url = fields.Char(string='Liên kết nhúng', compute='_compute_video_info', store=True)
 
     # Media Properties
     duration = fields.Integer(string='Thời lượng (giây)', help='Thời lượng cho video/âm thanh')
+    audio_bitrate = fields.Integer(string='Bitrate (kbps)', readonly=True, copy=False)
+    audio_codec = fields.Char(string='Codec', readonly=True, copy=False)
+    stream_file = fields.Binary(
+        string='Bản phát trực tuyến',
+        attachment=True,
+        readonly=True,
+        copy=False,
+        help='Bản nén của tệp âm thanh, được phát trên website thay cho tệp gốc'
+    )
+    stream_mimetype = fields.Char(string='Định dạng bản phát', readonly=True, copy=False)
     duration_display = fields.Char(string='Thời lượng', compute='_compute_duration_display')
     thumbnail = fields.Binary(string='Ảnh thu nhỏ', attachment=True)
 
@@ -83,21 +130,157 @@ class LibraryMedia(models.Model):
 
     @api.depends('file', 'filename')
     def _compute_file_info(self):
+        """Read size, MIME type and checksum from the stored attachment,
+        the file content itself is never loaded"""
+        attachments = self.env['ir.attachment'].sudo().search_read([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file'),
+            ('res_id', 'in', self.ids),
+        ], ['res_id', 'file_size', 'mimetype', 'checksum'])
+        attachment_by_media = {attachment['res_id']: attachment for attachment in attachments}
         for media in self:
-            if media.file and media.filename:
-                try:
-                    # Calculate file size in MB
-                    file_data = base64.b64decode(media.file)
-                    media.file_size = len(file_data) / (1024 * 1024)
-                except Exception:
-                    media.file_size = 0
-
-                # Detect MIME type
-                mime_type, _ = mimetypes.guess_type(media.filename)
+            attachment = attachment_by_media.get(media.id)
+            if attachment:
+                media.file_size = (attachment['file_size'] or 0) / (1024 * 1024)
+                # The attachment is named after the field, not the uploaded
+                # file, so its type is often only sniffed as octet-stream
+                mime_type = attachment['mimetype']
+                if not mime_type or mime_type == 'application/octet-stream':
+                    mime_type = mimetypes.guess_type(media.filename or '')[0]
                 media.mime_type = mime_type or 'application/octet-stream'
+                media.file_checksum = attachment['checksum']
             else:
                 media.file_size = 0
                 media.mime_type = False
+                media.file_checksum = False
+
+    @api.model
+    def _backfill_file_info(self):
+        """Recompute the file metadata of every media from its attachment in
+        a single UPDATE, in constant memory"""
+        self.env.flush_all()
+        self.env.cr.execute(SQL(
+            """
+            UPDATE library_media media
+               SET file_size = COALESCE(attachment.file_size, 0) / (1024.0 * 1024.0),
+                   mime_type = CASE
+                       WHEN attachment.mimetype IS NULL OR attachment.mimetype = 'application/octet-stream'
+                       THEN COALESCE(media.mime_type, 'application/octet-stream')
+                       ELSE attachment.mimetype
+                   END,
+                   file_checksum = attachment.checksum
+              FROM ir_attachment attachment
+             WHERE attachment.res_model = 'library.media'
+               AND attachment.res_field = 'file'
+               AND attachment.res_id = media.id
+            """
+        ))
+        updated = self.env.cr.rowcount
+        self.invalidate_model(['file_size', 'mime_type', 'file_checksum'])
+        return updated
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        media = super().create(vals_list)
+        # Probe/transcode new files in the background
+        self.env['library.media.job']._enqueue(media.filtered(lambda m: m.storage_type == 'file' and m.file_checksum))
+        return media
+
+    def write(self, vals):
+        res = super().write(vals)
+        if vals.get('file'):
+            self.env['library.media.job']._enqueue(self)
+        return res
+
+    @api.model
+    def _move_to_filestore(self, path):
+        """Move the file at ``path`` into the content-addressed filestore
+        without loading it in memory
+
+        :return: tuple (checksum, store_fname)
+        """
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as file:
+            while block := file.read(1024 * 1024):
+                sha1.update(block)
+        checksum = sha1.hexdigest()
+
+        # Identical content is stored once
+        Attachment = self.env['ir.attachment'].sudo()
+        store_fname = f'{checksum[:2]}/{checksum}'
+        full_path = Attachment._full_path(store_fname)
+        if os.path.exists(full_path):
+            os.unlink(path)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            shutil.move(path, full_path)
+            # Let the filestore garbage collector drop it if we roll back
+            Attachment._mark_for_gc(store_fname)
+        return checksum, store_fname
+
+    def _set_file_attachment(self, field_name, store_fname, checksum, file_size, mimetype):
+        """Point the binary field ``field_name`` to the filestore file ``store_fname``"""
+        self.ensure_one()
+        Attachment = self.env['ir.attachment'].sudo()
+        Attachment.search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', field_name),
+            ('res_id', '=', self.id),
+        ]).unlink()
+        Attachment.create({
+            'name': field_name,
+            'res_model': self._name,
+            'res_field': field_name,
+            'res_id': self.id,
+            'type': 'binary',
+            'store_fname': store_fname,
+            'file_size': file_size,
+            'checksum': checksum,
+            'mimetype': mimetype,
+        })
+        self.invalidate_recordset([field_name])
+        self.modified([field_name])
+
+    @api.depends('storage_type', 'file_url')
+    def _compute_video_info(self):
+        """Detect YouTube/Vimeo URLs once on write, not on every page view"""
+        for media in self:
+            media.update(self._parse_video_url(media.file_url if media.storage_type == 'url' else False))
+
+    @api.model
+    def _parse_video_url(self, url):
+        """Giá trị video_provider, video_id, video_embed_url của ``url``"""
+        provider = video_id = False
+        if url:
+            for pattern in YOUTUBE_ID_PATTERNS:
+                match = pattern.search(url)
+                if match:
+                    provider, video_id = 'youtube', match.group(1)
+                    break
+            match = VIMEO_ID_PATTERN.search(url)
+            if match:
+                provider, video_id = 'vimeo', match.group(1)
+        return {
+            'video_provider': provider,
+            'video_id': video_id,
+            'video_embed_url': provider and VIDEO_EMBED_URLS[provider] % video_id,
+        }
+
+    @api.model
+    def _backfill_video_info(self, batch_size=1000):
+        """Recompute the video metadata of every URL media, by batches"""
+        media_ids = self.with_context(active_test=False).search([('storage_type', '=', 'url')]).ids
+        for index in range(0, len(media_ids), batch_size):
+            batch = self.browse(media_ids[index:index + batch_size])
+            self.env.add_to_compute(self._fields['video_provider'], batch)
+            batch.flush_recordset(['video_provider', 'video_id', 'video_embed_url'])
+            self.env.invalidate_all()
+        return len(media_ids)
+
+    @api.model
+    def _get_video_thumbnail_domain(self):
+        # Direct video URLs have no platform thumbnail
+        return super()._get_video_thumbnail_domain() + [('video_provider', '!=', False)]
 
     @api.depends('duration')
     def _compute_duration_display(self):
@@ -119,6 +302,14 @@ class LibraryMedia(models.Model):
         for media in self:
             media.book_count = len(media.book_ids)
 
+    def _get_facet_fields(self):
+        return {
+            'language': 'language_id',
+            'publication_year': 'publication_date',
+            'author': 'author',
+            'media_type': 'media_type',
+        }
+
     @api.constrains('storage_type', 'file', 'file_url')
     def _check_storage(self):
         for media in self:
@@ -138,15 +329,8 @@ class LibraryMedia(models.Model):
     def action_play(self):
         """Open media player"""
         self.ensure_one()
-        # Increment view count
-        self.view_count += 1
-
-        # Log view if needed
-        self.env['library.media.view.log'].create({
-            'media_id': self.id,
-            'user_id': self.env.user.id,
-            'view_date': fields.Datetime.now(),
-        })
+        # Count the view and log it, applied in batch by the flush cron
+        self.env['library.media.hit'].sudo()._log_hit(self.id, 'view', self.env.user.id)
 
         return {
             'type': 'ir.actions.act_window',
@@ -167,8 +351,8 @@ class LibraryMedia(models.Model):
         if self.storage_type != 'file' or not self.file:
             raise exceptions.UserError('Không có tệp để tải xuống.')
 
-        # Increment download count
-        self.download_count += 1
+        # Count the download, applied in batch by the flush cron
+        self.env['library.media.hit'].sudo()._log_hit(self.id, 'download')
 
         return {
             'type': 'ir.actions.act_url',
@@ -196,7 +380,7 @@ class LibraryMediaViewLog(models.Model):
 
     media_id = fields.Many2one('library.media', string='Phương tiện', required=True, ondelete='cascade', index=True)
     user_id = fields.Many2one('res.users', string='Người dùng', required=True, ondelete='cascade', index=True)
-    view_date = fields.Datetime(string='Ngày xem', required=True, default=fields.Datetime.now)
+    view_date = fields.Datetime(string='Ngày xem', required=True, default=fields.Datetime.now, index=True)
     duration_played = fields.Integer(string='Thời gian xem (giây)')
 
     # Related fields for reporting
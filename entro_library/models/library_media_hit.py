@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+# Number of buffered hits applied per cron run, the cron re-triggers itself
+# while the buffer is not empty
+HIT_FLUSH_BATCH = 50000
+
+
+class LibraryMediaHit(models.Model):
+    """Append-only buffer of media views and downloads.
+
+    Website requests only insert a row here, which neither reads nor locks
+    the media record. ``_cron_flush_hits`` applies the buffered hits in
+    batches: counters are increased with one atomic ``UPDATE ... SET
+    view_count = view_count + n`` per batch, the daily rollup
+    ``library.media.view.stat`` is increased and the view log rows are created
+    at the same time.
+    """
+
+    _name = 'library.media.hit'
+    _description = 'Bộ đệm lượt xem/tải phương tiện'
+    _order = 'id'
+    _log_access = False
+
+    media_id = fields.Many2one('library.media', string='Phương tiện', required=True, ondelete='cascade')
+    user_id = fields.Many2one('res.users', string='Người dùng', ondelete='set null')
+    hit_type = fields.Selection([
+        ('view', 'Lượt xem'),
+        ('download', 'Lượt tải'),
+    ], string='Loại', required=True)
+    hit_date = fields.Datetime(string='Thời gian', required=True)
+
+    @api.model
+    def _log_hit(self, media_id, hit_type, user_id=None):
+        """Buffer a view or download of ``media_id``
+
+        :param user_id: viewer to record in the view log, None for anonymous hits
+        """
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO library_media_hit (media_id, user_id, hit_type, hit_date)
+            VALUES (%s, %s, %s, NOW() AT TIME ZONE 'UTC')
+            """,
+            media_id, user_id, hit_type,
+        ))
+
+    @api.model
+    def _cron_flush_hits(self):
+        """Apply buffered hits to the media counters and the view log"""
+        remaining = self._flush_hits(limit=HIT_FLUSH_BATCH)
+        if remaining:
+            self.env.ref('entro_library.cron_flush_media_hits')._trigger()
+
+    @api.model
+    def _flush_hits(self, limit=HIT_FLUSH_BATCH):
+        """Consume up to ``limit`` buffered hits.
+
+        Rows are claimed with ``SKIP LOCKED`` so concurrent flushes never
+        apply the same hit twice.
+
+        :return: whether hits are left in the buffer
+        """
+        self.env.flush_all()
+        hits = self.env.execute_query(SQL(
+            """
+            DELETE FROM library_media_hit
+             WHERE id IN (
+                    SELECT id FROM library_media_hit
+                     ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+                   )
+            RETURNING media_id, user_id, hit_type, hit_date
+            """,
+            limit,
+        ))
+        if not hits:
+            return False
+
+        counts = {}
+        views = []
+        view_logs = []
+        for media_id, user_id, hit_type, hit_date in hits:
+            media_counts = counts.setdefault(media_id, {'view': 0, 'download': 0})
+            media_counts[hit_type] += 1
+            if hit_type == 'view':
+                views.append((media_id, user_id, hit_date))
+                if user_id:
+                    view_logs.append({'media_id': media_id, 'user_id': user_id, 'view_date': hit_date})
+
+        self.env.cr.execute(SQL(
+            """
+            UPDATE library_media media
+               SET view_count = COALESCE(media.view_count, 0) + hits.views,
+                   download_count = COALESCE(media.download_count, 0) + hits.downloads
+              FROM (VALUES %s) AS hits(media_id, views, downloads)
+             WHERE media.id = hits.media_id
+            """,
+            SQL(", ").join(
+                SQL("(%s, %s, %s)", media_id, media_counts['view'], media_counts['download'])
+                for media_id, media_counts in counts.items()
+            ),
+        ))
+        self.env['library.media'].invalidate_model(['view_count', 'download_count'])
+        self.env['library.media.view.stat']._add_views(views)
+
+        if view_logs:
+            self.env['library.media.view.log'].create(view_logs)
+
+        return len(hits) == limit
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+# Attempts before a job is given up, the delay doubles after each failure
+MEDIA_JOB_MAX_ATTEMPTS = 5
+MEDIA_JOB_RETRY_DELAY = timedelta(minutes=5)
+# Jobs processed per cron run, the cron re-triggers itself while some are left
+MEDIA_JOB_BATCH = 10
+MEDIA_JOB_TIMEOUT = 3600
+# Running jobs older than this were left by a dead worker (ffprobe + ffmpeg)
+MEDIA_JOB_STALE_DELAY = timedelta(seconds=3 * MEDIA_JOB_TIMEOUT)
+# Media types whose files are handled by ffmpeg
+MEDIA_JOB_TYPES = ('audio', 'video')
+
+# Audio already in one of these codecs below this bitrate is streamed as is
+STREAMABLE_AUDIO_CODECS = ('mp3', 'aac', 'opus', 'vorbis')
+STREAM_AUDIO_BITRATE = 96
+
+
+class MediaJobError(Exception):
+    """Processing failure that retrying will not fix"""
+
+
+class LibraryMediaJob(models.Model):
+    """Background processing of uploaded media files.
+
+    Uploading or replacing the file of a media only queues a job, the
+    ``cron_process_media_jobs`` cron (run by the cron worker, not by the
+    upload request) probes the file with ``ffprobe`` to fill the duration,
+    bitrate and codec, and transcodes audio files to a compressed AAC
+    ``stream_file`` served by the website players. No row lock is held
+    while ffmpeg runs. Failed jobs are retried with an exponential backoff.
+    """
+
+    _name = 'library.media.job'
+    _description = 'Xử lý tệp phương tiện'
+    _order = 'next_attempt_date, id'
+    _rec_name = 'media_id'
+
+    media_id = fields.Many2one('library.media', string='Phương tiện', required=True, ondelete='cascade', index=True)
+    state = fields.Selection([
+        ('pending', 'Đang chờ'),
+        ('running', 'Đang xử lý'),
+        ('done', 'Hoàn thành'),
+        ('failed', 'Thất bại'),
+    ], string='Trạng thái', default='pending', required=True, index=True)
+    attempt_count = fields.Integer(string='Số lần thử', default=0)
+    next_attempt_date = fields.Datetime(string='Lần thử tiếp theo', default=fields.Datetime.now, required=True)
+    last_error = fields.Text(string='Lỗi gần nhất')
+
+    @api.model
+    def _enqueue(self, media):
+        """Queue the processing of the files of ``media``"""
+        media = media.filtered(lambda m: m.storage_type == 'file')
+        if not media:
+            return self
+        # A new file makes the rendition and pending jobs of the previous one useless
+        media.filtered('stream_mimetype').sudo().write({
+            'stream_file': False,
+            'stream_mimetype': False,
+            'audio_bitrate': 0,
+            'audio_codec': False,
+        })
+        self.sudo().search([('media_id', 'in', media.ids), ('state', '=', 'pending')]).unlink()
+        # Documents and images have nothing to probe or transcode
+        media = media.filtered(lambda m: m.media_type in MEDIA_JOB_TYPES)
+        if not media:
+            return self
+        jobs = self.sudo().create([{'media_id': m.id} for m in media])
+        self.env.ref('entro_library.cron_process_media_jobs').sudo()._trigger()
+        return jobs
+
+    @api.model
+    def _cron_process_jobs(self, limit=MEDIA_JOB_BATCH):
+        """Process the due jobs.
+
+        Each job is claimed (state 'running') in a short committed
+        transaction, ffprobe and ffmpeg then run without any row lock held,
+        and the results are saved in a second short transaction. Editing the
+        media or replacing its file never waits for a transcode.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self._requeue_stale_jobs()
+        for _index in range(limit):
+            job = self._claim_next_job()
+            if not job:
+                return
+            if auto_commit:
+                self.env.cr.commit()
+            try:
+                job._process(auto_commit=auto_commit)
+            except Exception as error:
+                _logger.warning("Processing of %s failed", job.media_id, exc_info=True)
+                if auto_commit:
+                    self.env.cr.rollback()
+                self.env.invalidate_all(flush=False)
+                if job.exists():
+                    job._schedule_retry(error)
+            if auto_commit:
+                self.env.cr.commit()
+        # Jobs are left, keep going in a new run
+        self.env.ref('entro_library.cron_process_media_jobs')._trigger()
+
+    @api.model
+    def _claim_next_job(self):
+        """Mark the next due job 'running', concurrent workers skip the job
+        being claimed"""
+        rows = self.env.execute_query(SQL(
+            """
+            UPDATE library_media_job
+               SET state = 'running', attempt_count = attempt_count + 1,
+                   write_uid = %(uid)s, write_date = NOW() AT TIME ZONE 'UTC'
+             WHERE id = (
+                    SELECT id FROM library_media_job
+                     WHERE state = 'pending' AND next_attempt_date <= NOW() AT TIME ZONE 'UTC'
+                  ORDER BY next_attempt_date, id
+                     LIMIT 1
+                       FOR UPDATE SKIP LOCKED
+                   )
+            RETURNING id
+            """,
+            uid=self.env.uid,
+        ))
+        self.invalidate_model()
+        return self.browse(rows[0][0] if rows else ())
+
+    @api.model
+    def _requeue_stale_jobs(self):
+        """Put back the jobs whose worker died while running them"""
+        stale = self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - MEDIA_JOB_STALE_DELAY),
+        ])
+        for job in stale:
+            job._schedule_retry(TimeoutError('Tiến trình xử lý bị dừng.'))
+
+    def _schedule_retry(self, error):
+        """Retry the job later, or give up after ``MEDIA_JOB_MAX_ATTEMPTS``
+
+        Attempts are counted when the job is claimed, so a job killing its
+        worker is given up too.
+        """
+        self.ensure_one()
+        give_up = isinstance(error, MediaJobError) or self.attempt_count >= MEDIA_JOB_MAX_ATTEMPTS
+        self.write({
+            'state': 'failed' if give_up else 'pending',
+            'next_attempt_date': fields.Datetime.now() + MEDIA_JOB_RETRY_DELAY * 2 ** max(self.attempt_count - 1, 0),
+            'last_error': str(error),
+        })
+
+    def _process(self, auto_commit=True):
+        """Probe the file of the media and build its streaming rendition"""
+        self.ensure_one()
+        media = self.media_id.sudo()
+        checksum = media.file_checksum
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', 'library.media'),
+            ('res_field', '=', 'file'),
+            ('res_id', '=', media.id),
+        ], limit=1)
+        if not attachment:
+            raise MediaJobError('Phương tiện không có tệp.')
+        if not shutil.which('ffprobe') or not shutil.which('ffmpeg'):
+            raise MediaJobError('Chưa cài đặt ffmpeg trên máy chủ.')
+
+        with tempfile.TemporaryDirectory(prefix='library_media_') as work_dir:
+            if attachment.store_fname:
+                source = attachment._full_path(attachment.store_fname)
+            else:
+                # Database storage, the file has to be written on disk first
+                source = os.path.join(work_dir, 'source')
+                with open(source, 'wb') as source_file:
+                    source_file.write(attachment.raw)
+            if auto_commit:
+                # Close the transaction, nothing is held while ffmpeg runs
+                self.env.cr.commit()
+
+            probe = self._probe(source)
+            rendition = None
+            if media.media_type == 'audio' and (
+                    probe['codec'] not in STREAMABLE_AUDIO_CODECS or probe['bitrate'] > STREAM_AUDIO_BITRATE * 1.5):
+                rendition = os.path.join(work_dir, 'stream.m4a')
+                self._run([
+                    'ffmpeg', '-nostdin', '-v', 'error', '-y', '-i', source,
+                    '-vn', '-c:a', 'aac', '-b:a', f'{STREAM_AUDIO_BITRATE}k', '-movflags', '+faststart',
+                    rendition,
+                ])
+            self._save_result(checksum, probe, rendition)
+
+    def _save_result(self, checksum, probe, rendition=None):
+        """Store the results of the job, unless the file of the media was
+        replaced while it ran: the new file has its own job"""
+        self.ensure_one()
+        self.env.invalidate_all()
+        media = self.media_id.sudo()
+        if not self.exists() or not media.exists():
+            return
+        if media.file_checksum != checksum:
+            self.write({'state': 'done', 'last_error': 'Tệp đã được thay thế, kết quả bị bỏ qua.'})
+            return
+        with self.env.cr.savepoint():
+            media.write({
+                'duration': probe['duration'] or media.duration,
+                'audio_bitrate': probe['bitrate'],
+                'audio_codec': probe['codec'],
+            })
+            if rendition:
+                file_size = os.path.getsize(rendition)
+                rendition_checksum, store_fname = media._move_to_filestore(rendition)
+                media._set_file_attachment('stream_file', store_fname, rendition_checksum, file_size, 'audio/mp4')
+                media.stream_mimetype = 'audio/mp4'
+            self.write({'state': 'done', 'last_error': False})
+
+    @api.model
+    def _probe(self, path):
+        """Thời lượng (giây), bitrate (kbps) và codec âm thanh của tệp ``path``"""
+        output = self._run([
+            'ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path,
+        ])
+        try:
+            data = json.loads(output)
+        except ValueError:
+            raise MediaJobError('Không đọc được thông tin tệp.')
+        file_format = data.get('format') or {}
+        audio_stream = next(
+            (stream for stream in data.get('streams', []) if stream.get('codec_type') == 'audio'), {},
+        )
+        return {
+            'duration': round(float(file_format.get('duration') or 0)),
+            'bitrate': int(audio_stream.get('bit_rate') or file_format.get('bit_rate') or 0) // 1000,
+            'codec': audio_stream.get('codec_name') or False,
+        }
+
+    @api.model
+    def _run(self, command):
+        """Run ``command`` and return its output, a non-zero exit means the
+        file cannot be processed"""
+        result = subprocess.run(command, capture_output=True, timeout=MEDIA_JOB_TIMEOUT, check=False)
+        if result.returncode:
+            raise MediaJobError(result.stderr.decode(errors='replace')[-1000:] or 'ffmpeg error')
+        return result.stdout
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+from odoo import models, fields, api, exceptions
 
 
 class LibraryMediaPlaylist(models.Model):
@@ -19,7 +19,7 @@ class LibraryMediaPlaylist(models.Model):
         'media_id',
         string='Phương tiện'
     )
-    media_count = fields.Integer(string='Số phương tiện', compute='_compute_media_count', store=True)
+    media_count = fields.Integer(string='Số phương tiện', compute='_compute_media_stats', store=True)
 
     # Ownership
     user_id = fields.Many2one(
@@ -38,28 +38,43 @@ class LibraryMediaPlaylist(models.Model):
     # Statistics
     total_duration = fields.Integer(
         string='Tổng thời lượng (giây)',
-        compute='_compute_total_duration',
+        compute='_compute_media_stats',
         store=True
     )
     total_duration_display = fields.Char(
         string='Tổng thời lượng',
-        compute='_compute_total_duration'
+        compute='_compute_total_duration_display'
     )
 
     # Status
     active = fields.Boolean(string='Hoạt động', default=True)
 
-    @api.depends('media_ids')
-    def _compute_media_count(self):
-        for playlist in self:
+    @api.depends('media_ids', 'media_ids.duration', 'media_ids.active')
+    def _compute_media_stats(self):
+        """Count and total duration of the playlists with one grouped query,
+        the media records are not loaded"""
+        saved = self.filtered(lambda playlist: isinstance(playlist.id, int))
+        stats = {}
+        if saved:
+            stats = {
+                playlist.id: (count, duration or 0)
+                for playlist, count, duration in self.env['library.media'].sudo()._read_group(
+                    [('playlist_ids', 'in', saved.ids)],
+                    groupby=['playlist_ids'],
+                    aggregates=['__count', 'duration:sum'],
+                )
+            }
+        for playlist in saved:
+            playlist.media_count, playlist.total_duration = stats.get(playlist.id, (0, 0))
+        # Playlists being edited in a form are not in the database yet
+        for playlist in self - saved:
             playlist.media_count = len(playlist.media_ids)
+            playlist.total_duration = sum(playlist.media_ids.mapped('duration'))
 
-    @api.depends('media_ids.duration')
-    def _compute_total_duration(self):
+    @api.depends('total_duration')
+    def _compute_total_duration_display(self):
         for playlist in self:
-            total = sum(playlist.media_ids.mapped('duration'))
-            playlist.total_duration = total
-
+            total = playlist.total_duration
             if total:
                 hours = total // 3600
                 minutes = (total % 3600) // 60
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import mimetypes
+import os
+import uuid
+from datetime import timedelta
+
+from odoo import models, fields, api, exceptions
+from odoo.tools import SQL, config
+
+# Size of the blocks read from the request body and from the assembled file
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+class LibraryMediaUpload(models.Model):
+    """Chunked, resumable upload of a ``library.media`` file.
+
+    Chunks are appended to a temporary file under the data directory, the
+    client can ask for ``received_size`` and resume from there after a
+    network failure. Once complete, the file is hashed by blocks and moved
+    into the content-addressed filestore, or dropped if the filestore already
+    holds the same content, and attached to the media without ever being
+    base64-encoded or loaded in memory.
+    """
+
+    _name = 'library.media.upload'
+    _description = 'Tải lên tệp phương tiện'
+    _order = 'create_date desc'
+
+    token = fields.Char(string='Mã phiên', required=True, readonly=True, index=True, copy=False,
+                        default=lambda self: uuid.uuid4().hex)
+    media_id = fields.Many2one('library.media', string='Phương tiện', required=True, ondelete='cascade')
+    filename = fields.Char(string='Tên tệp', required=True)
+    total_size = fields.Integer(string='Kích thước (byte)', required=True)
+    received_size = fields.Integer(string='Đã nhận (byte)', default=0)
+    checksum = fields.Char(string='Mã băm')
+    state = fields.Selection([
+        ('uploading', 'Đang tải lên'),
+        ('done', 'Hoàn thành'),
+    ], string='Trạng thái', default='uploading', required=True)
+
+    _sql_constraints = [
+        ('token_unique', 'UNIQUE(token)', 'Mã phiên tải lên phải là duy nhất!'),
+    ]
+
+    def _get_temp_path(self):
+        self.ensure_one()
+        directory = os.path.join(config['data_dir'], 'library_uploads', self.env.cr.dbname)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, self.token)
+
+    @api.model
+    def _start(self, media, filename, total_size, checksum=None):
+        """Open an upload session for ``media``.
+
+        When the client already knows the SHA1 of the file and the filestore
+        holds that content for another media the user can read, the file is
+        attached right away and nothing has to be uploaded. The checksum is
+        sent by the client and proves nothing, so the content of media the
+        user cannot read is never reused: it is uploaded and deduplicated by
+        the filestore on ``_finish``.
+        """
+        media.check_access('write')
+        upload = self.create({
+            'media_id': media.id,
+            'filename': filename,
+            'total_size': total_size,
+        })
+        readable_media = checksum and self.env['library.media'].search([('file_checksum', '=', checksum)])
+        if readable_media:
+            existing = self.env['ir.attachment'].sudo().search([
+                ('res_model', '=', 'library.media'),
+                ('res_field', '=', 'file'),
+                ('res_id', 'in', readable_media.ids),
+                ('checksum', '=', checksum),
+                ('file_size', '=', total_size),
+                ('store_fname', '!=', False),
+            ], limit=1)
+            if existing and os.path.exists(existing._full_path(existing.store_fname)):
+                upload._attach(checksum, existing.store_fname)
+        return upload
+
+    def _write_chunk(self, offset, stream):
+        """Append the chunk read from ``stream`` at ``offset``.
+
+        ``offset`` must equal ``received_size`` so that a retried or resumed
+        chunk can neither leave a hole nor be written twice.
+        """
+        self.ensure_one()
+        # Serialize concurrent chunks of the same session
+        self.env.cr.execute(SQL("SELECT 1 FROM library_media_upload WHERE id = %s FOR UPDATE", self.id))
+        if self.state != 'uploading':
+            raise exceptions.UserError('Phiên tải lên đã hoàn thành.')
+        path = self._get_temp_path()
+        received = os.path.getsize(path) if os.path.exists(path) else 0
+        if offset != received:
+            raise exceptions.UserError(f'Vị trí không hợp lệ, máy chủ đã nhận {received} byte.')
+
+        with open(path, 'ab') as temp_file:
+            while block := stream.read(UPLOAD_BLOCK_SIZE):
+                received += len(block)
+                if received > self.total_size:
+                    temp_file.truncate(offset)
+                    raise exceptions.UserError('Dữ liệu vượt quá kích thước tệp đã khai báo.')
+                temp_file.write(block)
+        self.received_size = received
+
+    def _finish(self):
+        """Hash the assembled file and attach it to the media"""
+        self.ensure_one()
+        if self.state == 'done':
+            return
+        path = self._get_temp_path()
+        if not os.path.exists(path) or os.path.getsize(path) != self.total_size:
+            raise exceptions.UserError('Tệp chưa được tải lên đầy đủ.')
+
+        if self.env['ir.attachment']._storage() != 'file':
+            # Database storage has no path to move the file to
+            sha1 = hashlib.sha1()
+            with open(path, 'rb') as temp_file:
+                while block := temp_file.read(UPLOAD_BLOCK_SIZE):
+                    sha1.update(block)
+                temp_file.seek(0)
+                self.media_id.sudo().write({'file': base64.b64encode(temp_file.read())})
+            self._attach(sha1.hexdigest())
+            os.unlink(path)
+            return
+
+        checksum, store_fname = self.media_id._move_to_filestore(path)
+        self._attach(checksum, store_fname)
+
+    def _attach(self, checksum, store_fname=None):
+        """Point the ``file`` field of the media to ``store_fname``"""
+        self.ensure_one()
+        media = self.media_id.sudo()
+        if store_fname:
+            media._set_file_attachment(
+                'file', store_fname, checksum, self.total_size,
+                mimetypes.guess_type(self.filename)[0] or 'application/octet-stream',
+            )
+            self.env['library.media.job']._enqueue(media)
+        media.write({'storage_type': 'file', 'filename': self.filename})
+        self.write({
+            'checksum': checksum,
+            'received_size': self.total_size,
+            'state': 'done',
+        })
+
+    def _get_duplicate_media(self):
+        """Other media holding the same content as this upload"""
+        self.ensure_one()
+        if not self.checksum:
+            return self.env['library.media']
+        return self.env['library.media'].search([
+            ('file_checksum', '=', self.checksum),
+            ('id', '!=', self.media_id.id),
+        ])
+
+    @api.model
+    def _cron_cleanup_uploads(self):
+        """Drop upload sessions left unfinished for more than two days"""
+        stale = self.search([
+            ('state', '=', 'uploading'),
+            ('create_date', '<', fields.Datetime.now() - timedelta(days=2)),
+        ])
+        for upload in stale:
+            path = upload._get_temp_path()
+            if os.path.exists(path):
+                os.unlink(path)
+        stale.unlink()
+        # Finished sessions are only kept for the resume/status calls
+        self.search([
+            ('state', '=', 'done'),
+            ('write_date', '<', fields.Datetime.now() - timedelta(days=2)),
+        ]).unlink()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.sql import column_exists, create_unique_index, index_exists
+
+# Raw view log rows deleted per statement by the retention job
+VIEW_LOG_PURGE_BATCH = 10000
+DEFAULT_VIEW_LOG_RETENTION_DAYS = 180
+
+
+class LibraryMediaViewStat(models.Model):
+    """Daily media views per borrower type.
+
+    Rows are increased by ``library.media.hit._flush_hits`` together with the
+    media counters, anonymous views being counted without borrower type. The
+    per-media daily total is the sum over the borrower types. Reports and
+    trending queries read this table, so the raw ``library.media.view.log``
+    only has to be kept for ``library.media_view_log_retention_days``.
+    """
+
+    _name = 'library.media.view.stat'
+    _description = 'Thống kê lượt xem phương tiện theo ngày'
+    _order = 'view_date desc, view_count desc'
+    _rec_name = 'media_id'
+    _log_access = False
+
+    view_date = fields.Date(string='Ngày', required=True, readonly=True, index=True)
+    media_id = fields.Many2one('library.media', string='Phương tiện', required=True, readonly=True,
+                               ondelete='cascade', index=True)
+    borrower_type_id = fields.Many2one('library.borrower.type', string='Loại độc giả', readonly=True,
+                                       ondelete='set null')
+    media_type = fields.Selection(related='media_id.media_type', string='Loại')
+    view_count = fields.Integer(string='Lượt xem', readonly=True, aggregator='sum')
+
+    def init(self):
+        # NULL borrower types (anonymous views) must conflict with each other
+        if not index_exists(self.env.cr, 'library_media_view_stat_unique'):
+            create_unique_index(self.env.cr, 'library_media_view_stat_unique', self._table,
+                                ['view_date', 'media_id', 'COALESCE(borrower_type_id, 0)'])
+        # Fill the table from the existing view log when the model is added to
+        # an installed module. On a new database the borrower type of the
+        # partners is not created yet, and there is no view to count anyway.
+        if not column_exists(self.env.cr, 'res_partner', 'borrower_type_id'):
+            return
+        self.env.cr.execute(SQL('SELECT 1 FROM %s LIMIT 1', SQL.identifier(self._table)))
+        if not self.env.cr.fetchone():
+            self._rebuild_from_view_log()
+
+    @api.model
+    def _upsert_sql(self, source):
+        """Add the views of ``source`` (SELECT view_date, media_id,
+        borrower_type_id, view_count) to the rollup"""
+        return SQL(
+            """
+            INSERT INTO library_media_view_stat (view_date, media_id, borrower_type_id, view_count)
+            %s
+            ON CONFLICT (view_date, media_id, COALESCE(borrower_type_id, 0)) DO UPDATE
+               SET view_count = library_media_view_stat.view_count + EXCLUDED.view_count
+            """,
+            source,
+        )
+
+    @api.model
+    def _rebuild_from_view_log(self):
+        """Count the member views of the raw view log, anonymous views were
+        never logged and are only counted from the install on"""
+        self.env.flush_all()
+        self.env.cr.execute(self._upsert_sql(SQL(
+            """
+            SELECT log.view_date::date, log.media_id, partner.borrower_type_id, COUNT(*)
+              FROM library_media_view_log log
+              JOIN res_users users ON users.id = log.user_id
+              JOIN res_partner partner ON partner.id = users.partner_id
+          GROUP BY 1, 2, 3
+            """
+        )))
+        self.invalidate_model()
+
+    @api.model
+    def _add_views(self, views):
+        """Count ``views``, a list of (media_id, user_id or None, view datetime)"""
+        if not views:
+            return
+        self.env.cr.execute(self._upsert_sql(SQL(
+            """
+            SELECT hit.hit_date::date, hit.media_id, partner.borrower_type_id, COUNT(*)
+              FROM (VALUES %s) AS hit(media_id, user_id, hit_date)
+         LEFT JOIN res_users users ON users.id = hit.user_id
+         LEFT JOIN res_partner partner ON partner.id = users.partner_id
+          GROUP BY 1, 2, 3
+            """,
+            SQL(", ").join(
+                SQL("(%s::int, %s::int, %s::timestamp)", media_id, user_id, hit_date)
+                for media_id, user_id, hit_date in views
+            ),
+        )))
+        self.invalidate_model()
+
+    @api.model
+    def _get_trending(self, days=7, limit=10, borrower_type=None, media_domain=None):
+        """Most viewed media over the last ``days`` days.
+
+        :param borrower_type: only count the views of this borrower type
+        :param media_domain: extra domain the media must match
+        :return: ``library.media`` records ordered from the most viewed
+        """
+        Media = self.env['library.media']
+        conditions = [SQL("stat.view_date >= %s", fields.Date.today() - timedelta(days=days))]
+        if borrower_type:
+            conditions.append(SQL("stat.borrower_type_id = %s", borrower_type.id))
+        if media_domain:
+            media_query = Media._search(media_domain)
+            if media_query.is_empty():
+                return Media
+            conditions.append(SQL("stat.media_id IN %s", media_query.subselect()))
+        rows = self.env.execute_query(SQL(
+            """
+            SELECT stat.media_id
+              FROM library_media_view_stat stat
+             WHERE %s
+          GROUP BY stat.media_id
+          ORDER BY SUM(stat.view_count) DESC, stat.media_id
+             LIMIT %s
+            """,
+            SQL(" AND ").join(conditions),
+            limit,
+        ))
+        return Media.browse([media_id for media_id, in rows])
+
+    @api.model
+    def _cron_purge_view_logs(self):
+        """Delete the raw view log rows older than the retention period,
+        their views are already counted in the rollup"""
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'library.media_view_log_retention_days', DEFAULT_VIEW_LOG_RETENTION_DAYS,
+        ) or 0)
+        if retention_days <= 0:
+            return
+        self.env.flush_all()
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM library_media_view_log
+             WHERE id IN (
+                    SELECT id FROM library_media_view_log
+                     WHERE view_date < %s
+                     LIMIT %s
+                   )
+            """,
+            fields.Datetime.now() - timedelta(days=retention_days),
+            VIEW_LOG_PURGE_BATCH,
+        ))
+        if self.env.cr.rowcount == VIEW_LOG_PURGE_BATCH:
+            self.env.ref('entro_library.cron_purge_media_view_logs')._trigger()
+        self.env['library.media.view.log'].invalidate_model()
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.sql import create_index, index_exists
+
+# Neighbours kept per item
+RECOMMENDATION_TOP_K = 12
+# Only the recent history is used for co-borrowing/co-viewing
+RECOMMENDATION_HISTORY_DAYS = 365
+# Most popular items of a category proposed to the other items of the category
+RECOMMENDATION_CATEGORY_TOP = 20
+# Authors with more items than this are too generic to relate items
+RECOMMENDATION_MAX_AUTHOR_ITEMS = 200
+# Borrowers/viewers with more distinct items than this are left out of the
+# co-occurrence signal, their N items would make N² pairs
+RECOMMENDATION_MAX_USER_ITEMS = 200
+
+# Weight of each signal in the similarity score
+WEIGHT_CO_OCCURRENCE = 3.0
+WEIGHT_AUTHOR = 2.0
+WEIGHT_CATEGORY = 1.0
+
+
+class LibraryRecommendationMixin(models.AbstractModel):
+    """Precomputed item-to-item neighbours.
+
+    ``_rebuild`` scores every pair of items from co-occurrence in the
+    borrowing or viewing history, shared authors and shared category, and
+    keeps the ``RECOMMENDATION_TOP_K`` best neighbours of each item. The cron
+    of each model rebuilds its table in one transaction, detail pages read
+    it with a lookup on ``(item_id, rank)``. Inheriting models declare
+    ``item_id`` and ``related_id`` and implement
+    ``_get_pair_scores_sql(since)``, the SELECT of the ``item_id,
+    related_id, score`` rows, a pair appearing once per signal.
+    """
+
+    _name = 'library.recommendation.mixin'
+    _description = 'Gợi ý liên quan'
+    _order = 'item_id, rank'
+    _log_access = False
+
+    score = fields.Float(string='Điểm', readonly=True)
+    rank = fields.Integer(string='Thứ hạng', readonly=True)
+
+    def init(self):
+        if self._abstract:
+            return
+        index_name = f'{self._table}_item_rank_index'
+        if not index_exists(self.env.cr, index_name):
+            create_index(self.env.cr, index_name, self._table, ['item_id', 'rank'])
+
+    @api.model
+    def _rebuild(self):
+        """Recompute the neighbours of every item"""
+        self.env.flush_all()
+        item_table = SQL.identifier(self.env[self._fields['item_id'].comodel_name]._table)
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM %(table)s;
+
+            INSERT INTO %(table)s (item_id, related_id, score, rank)
+            SELECT item_id, related_id, score, rank
+              FROM (
+                    SELECT pair.item_id, pair.related_id, SUM(pair.score) AS score,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY pair.item_id
+                               ORDER BY SUM(pair.score) DESC, pair.related_id DESC
+                           ) AS rank
+                      FROM (%(pairs)s) AS pair
+                      JOIN %(item_table)s related ON related.id = pair.related_id AND related.active
+                  GROUP BY pair.item_id, pair.related_id
+                   ) ranked
+             WHERE rank <= %(top_k)s
+            """,
+            table=SQL.identifier(self._table),
+            pairs=self._get_pair_scores_sql(fields.Date.today() - timedelta(days=RECOMMENDATION_HISTORY_DAYS)),
+            item_table=item_table,
+            top_k=RECOMMENDATION_TOP_K,
+        ))
+        self.invalidate_model()
+
+    @api.model
+    def _get_related(self, item, limit=6, domain=None):
+        """Best neighbours of ``item`` matching ``domain``, in the environment of ``item``"""
+        neighbours = self.sudo().search([
+            ('item_id', '=', item.id),
+            ('related_id', 'any', domain or []),
+        ], limit=limit)
+        return item.browse(neighbours.related_id.ids)
+
+
+class LibraryBookRelated(models.Model):
+    _name = 'library.book.related'
+    _description = 'Sách liên quan'
+    _inherit = ['library.recommendation.mixin']
+
+    item_id = fields.Many2one('library.book', string='Sách', required=True, readonly=True, ondelete='cascade')
+    related_id = fields.Many2one('library.book', string='Sách liên quan', required=True, readonly=True,
+                                 ondelete='cascade')
+
+    @api.model
+    def _get_pair_scores_sql(self, since):
+        return SQL(
+            """
+            WITH borrowed AS (
+                SELECT DISTINCT borrower_id, book_id
+                  FROM library_borrowing_line
+                 WHERE borrow_date >= %(since)s AND borrower_id IS NOT NULL AND book_id IS NOT NULL
+            ), borrower AS (
+                SELECT borrower_id FROM borrowed
+              GROUP BY borrower_id HAVING COUNT(*) <= %(max_user_items)s
+            )
+            -- Borrowed by the same borrowers
+            SELECT l1.book_id AS item_id, l2.book_id AS related_id,
+                   %(w_co)s * COUNT(*) AS score
+              FROM borrowed l1
+              JOIN borrower ON borrower.borrower_id = l1.borrower_id
+              JOIN borrowed l2
+                ON l2.borrower_id = l1.borrower_id AND l2.book_id != l1.book_id
+          GROUP BY l1.book_id, l2.book_id
+
+            UNION ALL
+
+            -- Shared authors
+            SELECT a1.book_id, a2.book_id, %(w_author)s * COUNT(*)
+              FROM library_book_author_rel a1
+              JOIN library_book_author_rel a2
+                ON a2.author_id = a1.author_id AND a2.book_id != a1.book_id
+             WHERE a1.author_id IN (
+                    SELECT author_id FROM library_book_author_rel
+                  GROUP BY author_id HAVING COUNT(*) <= %(max_author_items)s
+                   )
+          GROUP BY a1.book_id, a2.book_id
+
+            UNION ALL
+
+            -- Most borrowed books of the same category
+            SELECT book.id, top.id, %(w_category)s
+              FROM library_book book
+              JOIN (
+                    SELECT b.id, b.category_id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY b.category_id
+                               ORDER BY COALESCE(p.borrow_count, 0) DESC, b.id DESC
+                           ) AS category_rank
+                      FROM library_book b
+                 LEFT JOIN library_book_popularity p ON p.book_id = b.id
+                     WHERE b.active AND b.category_id IS NOT NULL
+                   ) top
+                ON top.category_id = book.category_id AND top.id != book.id
+               AND top.category_rank <= %(category_top)s
+            """,
+            since=since,
+            w_co=WEIGHT_CO_OCCURRENCE,
+            w_author=WEIGHT_AUTHOR,
+            w_category=WEIGHT_CATEGORY,
+            max_author_items=RECOMMENDATION_MAX_AUTHOR_ITEMS,
+            max_user_items=RECOMMENDATION_MAX_USER_ITEMS,
+            category_top=RECOMMENDATION_CATEGORY_TOP,
+        )
+
+
+class LibraryMediaRelated(models.Model):
+    _name = 'library.media.related'
+    _description = 'Phương tiện liên quan'
+    _inherit = ['library.recommendation.mixin']
+
+    item_id = fields.Many2one('library.media', string='Phương tiện', required=True, readonly=True,
+                              ondelete='cascade')
+    related_id = fields.Many2one('library.media', string='Phương tiện liên quan', required=True, readonly=True,
+                                 ondelete='cascade')
+
+    @api.model
+    def _get_pair_scores_sql(self, since):
+        return SQL(
+            """
+            WITH viewed AS (
+                SELECT DISTINCT user_id, media_id
+                  FROM library_media_view_log
+                 WHERE view_date >= %(since)s AND user_id IS NOT NULL
+            ), viewer AS (
+                SELECT user_id FROM viewed
+              GROUP BY user_id HAVING COUNT(*) <= %(max_user_items)s
+            )
+            -- Viewed by the same users
+            SELECT v1.media_id AS item_id, v2.media_id AS related_id,
+                   %(w_co)s * COUNT(*) AS score
+              FROM viewed v1
+              JOIN viewer ON viewer.user_id = v1.user_id
+              JOIN viewed v2
+                ON v2.user_id = v1.user_id AND v2.media_id != v1.media_id
+          GROUP BY v1.media_id, v2.media_id
+
+            UNION ALL
+
+            -- Same author
+            SELECT m1.id, m2.id, %(w_author)s
+              FROM library_media m1
+              JOIN library_media m2
+                ON lower(trim(m2.author)) = lower(trim(m1.author)) AND m2.id != m1.id
+             WHERE lower(trim(m1.author)) IN (
+                    SELECT lower(trim(author)) FROM library_media
+                     WHERE author IS NOT NULL AND trim(author) != ''
+                  GROUP BY lower(trim(author)) HAVING COUNT(*) <= %(max_author_items)s
+                   )
+
+            UNION ALL
+
+            -- Most viewed media of the same category
+            SELECT media.id, top.id, %(w_category)s
+              FROM library_media media
+              JOIN (
+                    SELECT m.id, m.category_id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY m.category_id
+                               ORDER BY COALESCE(m.view_count, 0) DESC, m.id DESC
+                           ) AS category_rank
+                      FROM library_media m
+                     WHERE m.active AND m.category_id IS NOT NULL
+                   ) top
+                ON top.category_id = media.category_id AND top.id != media.id
+               AND top.category_rank <= %(category_top)s
+            """,
+            since=since,
+            w_co=WEIGHT_CO_OCCURRENCE,
+            w_author=WEIGHT_AUTHOR,
+            w_category=WEIGHT_CATEGORY,
+            max_author_items=RECOMMENDATION_MAX_AUTHOR_ITEMS,
+            max_user_items=RECOMMENDATION_MAX_USER_ITEMS,
+            category_top=RECOMMENDATION_CATEGORY_TOP,
+        )
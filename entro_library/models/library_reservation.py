@@ -16,7 +16,7 @@ class LibraryReservation(models.Model):
     quant_id = fields.Many2one(
         'library.book.quant', string='Bản sao sách', tracking=True)
     book_id = fields.Many2one(
-        'library.book', string='Sách', required=True, tracking=True)
+        'library.book', string='Sách', required=True, tracking=True, index=True)
 
     # Dates
     reservation_date = fields.Date(
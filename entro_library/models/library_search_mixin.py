@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import unicodedata
+
+from odoo import api, fields, models
+from odoo.tools import SQL, html2plaintext
+
+
+class LibrarySearchMixin(models.AbstractModel):
+    """Accent-insensitive catalog search.
+
+    Models inheriting from this mixin keep a stored, diacritics-folded copy of
+    their searchable text in ``search_text``. The column carries a trigram
+    index so ``ilike`` lookups on it do not scan the whole table, and
+    ``_search_ranked`` ranks matches by trigram word similarity.
+    ``_get_facet_counts`` counts the matches per facet value for the sidebar
+    filters.
+    """
+
+    _name = 'library.search.mixin'
+    _description = 'Tìm kiếm không dấu'
+
+    # Fields concatenated into search_text, overridden by inheriting models
+    _search_text_fields = ['name']
+    # Fields whose value is HTML and must be converted to plain text first
+    _search_text_html_fields = []
+
+    search_text = fields.Char(
+        string='Nội dung tìm kiếm',
+        compute='_compute_search_text',
+        store=True,
+        index='trigram',
+        unaccent=False,
+        copy=False,
+        help='Nội dung tìm kiếm đã bỏ dấu và chuyển về chữ thường'
+    )
+
+    @api.model
+    def _normalize_search_text(self, text):
+        """Fold Vietnamese diacritics and case so "Phật" matches "phat" """
+        if not text:
+            return ''
+        nfd = unicodedata.normalize('NFD', text)
+        without_accents = ''.join(
+            char for char in nfd if unicodedata.category(char) != 'Mn')
+        without_accents = without_accents.replace('Đ', 'D').replace('đ', 'd')
+        return ' '.join(without_accents.lower().split())
+
+    @api.depends(lambda self: self._search_text_fields)
+    def _compute_search_text(self):
+        for record in self:
+            parts = []
+            for field_name in record._search_text_fields:
+                value = record[field_name]
+                if not value:
+                    continue
+                if field_name in record._search_text_html_fields:
+                    value = html2plaintext(value)
+                parts.append(value)
+            record.search_text = record._normalize_search_text(' '.join(parts)) or False
+
+    @api.model
+    def _get_search_domain(self, search):
+        """Domain matching ``search`` against the folded search text"""
+        term = self._normalize_search_text(search)
+        if not term:
+            return []
+        return [('search_text', 'ilike', term)]
+
+    @api.model
+    def _search_ranked(self, domain, search=None, offset=0, limit=None, order=None):
+        """Search ``domain``, ranking the matches by relevance to ``search``.
+
+        ``domain`` is expected to already contain ``_get_search_domain(search)``.
+        When no explicit ``order`` is given and a search term is present, the
+        results are ranked by trigram word similarity against the search text
+        (best match first), then by the model's default order.
+
+        :return: recordset of the requested page
+        """
+        term = self._normalize_search_text(search)
+        if order or not term or not self.env.registry.has_trigram:
+            return self.search(domain, offset=offset, limit=limit, order=order)
+
+        query = self._search(domain, offset=offset, limit=limit, order=self._order)
+        query.order = SQL(
+            "word_similarity(%s, %s) DESC, %s",
+            term,
+            self._field_to_sql(self._table, 'search_text', query),
+            query.order,
+        )
+        return self.browse(query.get_result_ids())
+
+    def _get_facet_fields(self):
+        """Catalog facets of the model, ``{facet name: field name}``"""
+        return {}
+
+    def _get_facet_value_sql(self, facet, alias):
+        """SELECT returning the value(s) of ``facet`` for the row ``alias``.
+
+        Many2many facets return one row per related record, date facets are
+        grouped by year.
+        """
+        field = self._fields[self._get_facet_fields()[facet]]
+        if field.type == 'many2many':
+            return SQL(
+                "SELECT %s::text FROM %s WHERE %s = %s",
+                SQL.identifier(field.column2),
+                SQL.identifier(field.relation),
+                SQL.identifier(field.column1),
+                SQL.identifier(alias, 'id'),
+            )
+        if field.type in ('date', 'datetime'):
+            return SQL("SELECT EXTRACT(YEAR FROM %s)::int::text", SQL.identifier(alias, field.name))
+        return SQL("SELECT %s::text", SQL.identifier(alias, field.name))
+
+    @api.model
+    def _get_facet_counts(self, domain, facets=None):
+        """Count the records of ``domain`` per value of each facet.
+
+        All facets are computed by a single grouped query, no record is read.
+
+        :param facets: facet names to compute, all facets of the model if empty
+        :return dict: ``{facet: {value: count}}``, ids for relational facets
+            and years for date facets
+        """
+        facet_fields = self._get_facet_fields()
+        facets = [facet for facet in (facets or facet_fields) if facet in facet_fields]
+        counts = {facet: {} for facet in facets}
+        query = self._search(domain)
+        if not facets or query.is_empty():
+            return counts
+
+        self.env.flush_all()
+        facet_values = SQL(" UNION ALL ").join(
+            SQL("SELECT %s, value FROM (%s) AS facet_value(value)",
+                facet, self._get_facet_value_sql(facet, self._table))
+            for facet in facets
+        )
+        rows = self.env.execute_query(SQL(
+            """
+            SELECT facet.name, facet.value, COUNT(*)
+              FROM %(from_clause)s
+        CROSS JOIN LATERAL (%(facet_values)s) AS facet(name, value)
+             WHERE %(where_clause)s AND facet.value IS NOT NULL
+          GROUP BY facet.name, facet.value
+            """,
+            from_clause=query.from_clause,
+            facet_values=facet_values,
+            where_clause=query.where_clause or SQL("TRUE"),
+        ))
+        for facet, value, count in rows:
+            value = self._parse_facet_value(facet, value)
+            counts[facet][value] = counts[facet].get(value, 0) + count
+        return counts
+
+    def _parse_facet_value(self, facet, value):
+        """Python value of the text returned by ``_get_facet_value_sql``"""
+        field = self._fields[self._get_facet_fields()[facet]]
+        if field.type in ('many2one', 'many2many', 'date', 'datetime', 'integer'):
+            return int(value)
+        return value
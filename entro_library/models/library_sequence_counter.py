@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+
+class LibrarySequenceCounter(models.Model):
+    """Last number given for each sequence prefix and period.
+
+    Used by ``library.sequence.mixin`` models with ``_sequence_allocator =
+    'counter'``. The key is the formatted sequence with a zero number (e.g.
+    ``PM/2024/09/00000``), so every prefix, period and number length has its
+    own row. The allocation is an upsert that keeps the row locked until the
+    end of the transaction, and a rolled back transaction gives its number
+    back, so the sequence stays without gaps. Odoo transactions run in
+    REPEATABLE READ: a concurrent confirmation updating the same row does
+    not get the next number but fails with a serialization error once the
+    first one commits. It never computes the same number, and relies on
+    being retried, as the HTTP layer and ``odoo.service.model.retrying`` do.
+    """
+
+    _name = 'library.sequence.counter'
+    _description = 'Bộ đếm số thứ tự'
+    _rec_name = 'sequence_key'
+    _log_access = False
+
+    res_model = fields.Char(string='Model', required=True, readonly=True)
+    sequence_key = fields.Char(string='Mẫu số thứ tự', required=True, readonly=True)
+    last_number = fields.Integer(string='Số cuối cùng', readonly=True)
+
+    _sql_constraints = [
+        ('sequence_key_unique', 'UNIQUE(res_model, sequence_key)', 'Mỗi mẫu số thứ tự chỉ có một bộ đếm!'),
+    ]
+
+    @api.model
+    def _allocate(self, res_model, sequence_key, minimum, count=1):
+        """Reserve ``count`` consecutive numbers of ``sequence_key``.
+
+        :param minimum: lowest acceptable first number, i.e. the number
+            following the last sequence found in the table. It seeds the row
+            and skips the numbers given by hand above the counter.
+        :return: the first reserved number
+        """
+        [(last_number,)] = self.env.execute_query(SQL(
+            """
+            INSERT INTO library_sequence_counter (res_model, sequence_key, last_number)
+            VALUES (%(res_model)s, %(sequence_key)s, %(minimum)s + %(count)s - 1)
+            ON CONFLICT (res_model, sequence_key) DO UPDATE
+               SET last_number = GREATEST(library_sequence_counter.last_number + 1, %(minimum)s) + %(count)s - 1
+            RETURNING last_number
+            """,
+            res_model=res_model,
+            sequence_key=sequence_key,
+            minimum=minimum,
+            count=count,
+        ))
+        self.invalidate_model()
+        return last_number - count + 1
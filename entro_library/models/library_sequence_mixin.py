@@ -24,6 +24,9 @@ class LibrarySequenceMixin(models.AbstractModel):
     _sequence_field = "name"
     _sequence_date_field = "date"
     _sequence_index = False
+    # 'scan' takes the number following the last one found in the table,
+    # 'counter' allocates it from a library.sequence.counter row
+    _sequence_allocator = 'scan'
 
     prefix = r'(?P<prefix1>.*?)'
     prefix2 = r'(?P<prefix2>\D)'
@@ -308,15 +311,11 @@ class LibrarySequenceMixin(models.AbstractModel):
         self.ensure_one()
         format_string, format_values = self._get_next_sequence_format()
 
-        registry = self.env.registry
-        triggers = registry._field_triggers[self._fields[self._sequence_field]]
-        for inverse_field, triggered_fields in triggers.items():
-            for triggered_field in triggered_fields:
-                if not triggered_field.store or not triggered_field.compute:
-                    continue
-                for field in registry.field_inverses[inverse_field[0]] if inverse_field else [None]:
-                    self.env.add_to_compute(triggered_field, self[field.name] if field else self)
+        self._add_sequence_triggers_to_compute()
         self.flush_recordset()
+        if self._get_sequence_allocator() == 'counter':
+            self._set_next_sequence_from_counter(format_string, format_values)
+            return
         with self.env.cr.savepoint(flush=False) as sp:
             while True:
                 format_values['seq'] = format_values['seq'] + 1
@@ -329,6 +328,104 @@ class LibrarySequenceMixin(models.AbstractModel):
                 except (pgerrors.ExclusionViolation, pgerrors.UniqueViolation):
                     sp.rollback()
 
+    def _add_sequence_triggers_to_compute(self):
+        """Mark the stored fields depending on the sequence field to compute,
+        before the records are flushed"""
+        registry = self.env.registry
+        triggers = registry._field_triggers[self._fields[self._sequence_field]]
+        for inverse_field, triggered_fields in triggers.items():
+            for triggered_field in triggered_fields:
+                if not triggered_field.store or not triggered_field.compute:
+                    continue
+                for field in registry.field_inverses[inverse_field[0]] if inverse_field else [None]:
+                    for record in self:
+                        self.env.add_to_compute(triggered_field, record[field.name] if field else record)
+
+    def _set_next_sequences(self):
+        """Set the next sequence of every record of ``self``.
+
+        Records sharing the domain of the last sequence (which holds the
+        date range of their period) are numbered together: the last sequence
+        is read once per group, the group gets consecutive numbers (allocated
+        at once in counter mode) and is flushed in one go.
+        """
+        groups = defaultdict(list)
+        for record in self:
+            where_string, params = record._get_last_sequence_domain()
+            groups[(where_string, frozendict(params))].append(record)
+
+        for group in groups.values():
+            records = self.browse().concat(*group)
+            if len(records) == 1:
+                records._set_next_sequence()
+                continue
+            format_string, format_values = records[0]._get_next_sequence_format()
+            records._add_sequence_triggers_to_compute()
+            records.flush_recordset()
+            if records._get_sequence_allocator() == 'counter':
+                number = self.env['library.sequence.counter'].sudo()._allocate(
+                    self._name,
+                    format_string.format(**dict(format_values, seq=0)),
+                    format_values['seq'] + 1,
+                    count=len(records),
+                )
+            else:
+                number = format_values['seq'] + 1
+            try:
+                with self.env.cr.savepoint(flush=False), mute_logger('odoo.sql_db'):
+                    for offset, record in enumerate(records):
+                        record[self._sequence_field] = format_string.format(**dict(format_values, seq=number + offset))
+                    records.flush_recordset([self._sequence_field])
+            except (pgerrors.ExclusionViolation, pgerrors.UniqueViolation):
+                # Numbers of the range were given by hand: number the records
+                # one by one with the rest of the range, so that it leaves no
+                # gap, then with new numbers once it is used up
+                records.invalidate_recordset([self._sequence_field], flush=False)
+                numbers = iter(range(number, number + len(records)))
+                for record in records:
+                    if not any(
+                        record._try_set_sequence(format_string.format(**dict(format_values, seq=candidate)))
+                        for candidate in numbers
+                    ):
+                        record._set_next_sequence()
+
+    def _try_set_sequence(self, sequence):
+        """Set ``sequence`` unless the database refuses it as a duplicate
+
+        :return: whether the sequence was set
+        """
+        self.ensure_one()
+        try:
+            with self.env.cr.savepoint(flush=False), mute_logger('odoo.sql_db'):
+                self[self._sequence_field] = sequence
+                self.flush_recordset([self._sequence_field])
+                return True
+        except (pgerrors.ExclusionViolation, pgerrors.UniqueViolation):
+            return False
+
+    def _get_sequence_allocator(self):
+        return self.env.context.get('sequence_allocator') or self._sequence_allocator
+
+    def _set_next_sequence_from_counter(self, format_string, format_values):
+        """Set the next sequence with a number allocated from the counter of
+        its prefix and period.
+
+        The format is still deduced from the last sequence of the table, only
+        the number comes from ``library.sequence.counter``. The counter row
+        stays locked until the end of the transaction, so concurrent
+        transactions do not compute the same number: they fail with a
+        serialization error and are retried.
+        """
+        self.ensure_one()
+        Counter = self.env['library.sequence.counter'].sudo()
+        sequence_key = format_string.format(**dict(format_values, seq=0))
+        number = format_values['seq']
+        while True:
+            number = Counter._allocate(self._name, sequence_key, number + 1)
+            # A number refused was given by hand, it is used and no gap is left
+            if self._try_set_sequence(format_string.format(**dict(format_values, seq=number))):
+                return
+
     def _get_next_sequence_format(self):
         """Get the next sequence format and its values.
 
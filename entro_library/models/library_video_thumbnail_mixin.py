@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import base64
+
+from odoo import models, fields, api
+
+from odoo.addons.web_editor.tools import get_video_thumbnail
+
+# Records handled per cron run, the cron re-triggers itself while some are left
+VIDEO_THUMBNAIL_BATCH = 50
+
+
+class LibraryVideoThumbnailMixin(models.AbstractModel):
+    """Fetch the thumbnail of a video URL in the background.
+
+    Fetching a thumbnail is a network call to the video platform, it is done
+    by the ``cron_fetch_video_thumbnails`` cron instead of during the form
+    onchange or the write. Records sharing the same URL reuse the thumbnail
+    already fetched. Inheriting models set ``_video_url_field`` and
+    ``_video_thumbnail_field``.
+    """
+
+    _name = 'library.video.thumbnail.mixin'
+    _description = 'Ảnh thu nhỏ video'
+
+    _video_url_field = 'video_url'
+    _video_thumbnail_field = 'image_1920'
+
+    video_thumbnail_checked = fields.Boolean(
+        string='Đã lấy ảnh video',
+        compute='_compute_video_thumbnail_checked',
+        store=True,
+        readonly=False,
+        copy=False,
+    )
+
+    @api.depends(lambda self: [self._video_url_field])
+    def _compute_video_thumbnail_checked(self):
+        # A new URL needs a new thumbnail
+        self.video_thumbnail_checked = False
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if any(vals.get(self._video_url_field) for vals in vals_list):
+            self._trigger_video_thumbnail_fetch()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if vals.get(self._video_url_field):
+            self._trigger_video_thumbnail_fetch()
+        return res
+
+    @api.model
+    def _trigger_video_thumbnail_fetch(self):
+        cron = self.env.ref('entro_library.cron_fetch_video_thumbnails', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _get_video_thumbnail_domain(self):
+        return [
+            (self._video_url_field, '!=', False),
+            (self._video_thumbnail_field, '=', False),
+            ('video_thumbnail_checked', '=', False),
+        ]
+
+    @api.model
+    def _fetch_video_thumbnail(self, video_url):
+        """Ảnh thu nhỏ (base64) của ``video_url`` lấy từ nền tảng video
+
+        The only network access of the mixin, tests patch this method.
+        """
+        thumbnail = get_video_thumbnail(video_url)
+        return thumbnail and base64.b64encode(thumbnail)
+
+    @api.model
+    def _get_cached_video_thumbnail(self, video_url):
+        """Ảnh thu nhỏ đã có của một bản ghi khác cùng ``video_url``"""
+        record = self.with_context(active_test=False).search([
+            (self._video_url_field, '=', video_url),
+            (self._video_thumbnail_field, '!=', False),
+        ], limit=1)
+        return record[self._video_thumbnail_field]
+
+    @api.model
+    def _fetch_video_thumbnails(self, limit=VIDEO_THUMBNAIL_BATCH):
+        """Fill the missing thumbnails of up to ``limit`` records
+
+        :return: whether records are left to process
+        """
+        records = self.with_context(active_test=False).search(self._get_video_thumbnail_domain(), limit=limit + 1)
+        cache = {}
+        for record in records[:limit]:
+            video_url = record[self._video_url_field]
+            if video_url not in cache:
+                cache[video_url] = self._get_cached_video_thumbnail(video_url) or self._fetch_video_thumbnail(video_url)
+            vals = {'video_thumbnail_checked': True}
+            if cache[video_url]:
+                vals[self._video_thumbnail_field] = cache[video_url]
+            record.write(vals)
+        return len(records) > limit
+
+    @api.model
+    def _cron_fetch_video_thumbnails(self):
+        """Fetch missing video thumbnails of every model using the mixin"""
+        remaining = False
+        for model_name in self.env.registry.descendants([self._name], '_inherit'):
+            Model = self.env[model_name]
+            if not Model._abstract:
+                remaining |= Model._fetch_video_thumbnails()
+        if remaining:
+            self.env.ref('entro_library.cron_fetch_video_thumbnails')._trigger()
@@ -58,6 +58,14 @@ class ResConfigSettings(models.TransientModel):
         help='Số ngày giữ sách sau khi thông báo có sẵn cho người đặt trước'
     )
 
+    # Media settings
+    media_view_log_retention_days = fields.Integer(
+        string='Lưu lịch sử xem (ngày)',
+        default=180,
+        config_parameter='library.media_view_log_retention_days',
+        help='Số ngày giữ lịch sử xem chi tiết, thống kê theo ngày được giữ lâu dài. 0 để không xóa'
+    )
+
     # Membership settings
     default_membership_months = fields.Integer(
         string='Thời hạn thẻ mặc định (tháng)',
@@ -0,0 +1,43 @@
+"""
+Số thế hệ dùng làm khóa ormcache để vô hiệu hóa một bộ nhớ đệm riêng lẻ
+
+``registry.clear_cache()`` empties the whole default ormcache of every
+worker. A cached method taking ``get_cache_generation(cr, name)`` as part of
+its key is invalidated alone by ``bump_cache_generation(env, name)``: the
+generation is a PostgreSQL sequence, shared by the workers, and ``nextval``
+neither locks nor waits for the transaction.
+"""
+from odoo.tools import SQL
+
+
+def ensure_cache_generation(cr, name):
+    """Create the generation sequence ``name``, to call from ``init``"""
+    cr.execute(SQL("CREATE SEQUENCE IF NOT EXISTS %s", SQL.identifier(name)))
+
+
+def get_cache_generation(cr, name):
+    cr.execute(SQL("SELECT last_value FROM %s", SQL.identifier(name)))
+    return cr.fetchone()[0]
+
+
+def bump_cache_generation(env, name):
+    """
+    Chuyển sang thế hệ mới ngay và một lần nữa sau khi giao dịch được commit
+
+    The second bump drops what another worker may have cached from the data
+    committed before this transaction, between the first bump and the commit.
+    It is registered once per transaction.
+    """
+    query = SQL("SELECT nextval(%s)", name)
+    env.cr.execute(query)
+
+    key = f'cache_generation.{name}'
+    if env.cr.postcommit.data.get(key):
+        return
+    env.cr.postcommit.data[key] = True
+    registry = env.registry
+
+    @env.cr.postcommit.add
+    def bump_after_commit():
+        with registry.cursor() as cr:
+            cr.execute(query)
@@ -0,0 +1,139 @@
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+
+from odoo.tools import SQL, str2bool
+
+# Listings count at most this many records, above it the total is shown as "N+"
+KEYSET_COUNT_CAP = 1000
+
+
+def keyset_enabled(env, cursor=None, page=1):
+    """
+    Phân trang keyset khi có ``cursor`` hoặc bật tham số ``library.keyset_pagination``
+
+    Numbered pages (``/page/N``) keep using OFFSET so existing links still work.
+    """
+    if cursor:
+        return True
+    if int(page or 1) > 1:
+        return False
+    param = env['ir.config_parameter'].sudo().get_param('library.keyset_pagination')
+    return str2bool(param or 'false', default=False)
+
+
+def parse_keyset_order(model, order):
+    """
+    Chuyển chuỗi ``order`` thành danh sách khóa sắp xếp cho phân trang keyset
+
+    :return: list of (field name, descending), ending with ``id``, or None if
+        the order cannot be used for seeking (non-column or relational field)
+    """
+    keys = []
+    for term in (order or '').split(','):
+        parts = term.strip().lower().split()
+        if not parts:
+            continue
+        field = model._fields.get(parts[0])
+        if (not field or not field.store or not field.column_type
+                or field.type in ('many2one', 'binary', 'html')
+                or len(parts) > 2 or parts[1:] not in ([], ['asc'], ['desc'])):
+            return None
+        keys.append((field.name, parts[1:] == ['desc']))
+    if not keys or keys[-1][0] != 'id':
+        keys.append(('id', keys[-1][1] if keys else False))
+    return keys
+
+
+def encode_cursor(values):
+    data = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Giá trị khóa của bản ghi cuối trang trước, None nếu cursor không hợp lệ"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if (not isinstance(values, list) or len(values) != size
+            or not isinstance(values[-1], int)
+            or not all(value is None or isinstance(value, (str, int, float)) for value in values)):
+        return None
+    return values
+
+
+def _seek_condition(columns, keys, values):
+    """
+    Điều kiện "nằm sau bản ghi ``values``" theo thứ tự ``keys``, NULL luôn ở cuối
+
+    (k1 after v1) OR (k1 = v1 AND ((k2 after v2) OR (k2 = v2 AND ...)))
+    """
+    condition = None
+    for column, (_fname, descending), value in reversed(list(zip(columns, keys, values))):
+        if value is None:
+            after = SQL("FALSE")
+            equal = SQL("%s IS NULL", column)
+        else:
+            operator = SQL("<") if descending else SQL(">")
+            after = SQL("(%s %s %s OR %s IS NULL)", column, operator, value, column)
+            equal = SQL("%s = %s", column, value)
+        condition = after if condition is None else SQL("(%s OR (%s AND %s))", after, equal, condition)
+    return condition
+
+
+def keyset_search(model, domain, order, limit, cursor=None):
+    """
+    Tìm kiếm một trang theo phân trang keyset (seek) thay vì OFFSET
+
+    The page starts right after the record encoded in ``cursor`` so the cost
+    does not grow with the page depth.
+
+    :return: tuple (records, next_cursor), next_cursor is None on the last page
+        and records is None if ``order`` does not support seeking
+    """
+    keys = parse_keyset_order(model, order)
+    if keys is None:
+        return None, None
+
+    order_spec = ', '.join(
+        f"{fname} {'desc' if descending else 'asc'}{' nulls last' if fname != 'id' else ''}"
+        for fname, descending in keys
+    )
+    query = model._search(domain, limit=limit + 1, order=order_spec)
+    if query.is_empty():
+        return model.browse(), None
+    columns = [model._field_to_sql(model._table, fname, query) for fname, _descending in keys]
+    values = cursor and decode_cursor(cursor, len(keys))
+    if values:
+        query.add_where(_seek_condition(columns, keys, values))
+
+    rows = model.env.execute_query(query.select(*columns))
+    next_cursor = encode_cursor(list(rows[limit - 1])) if len(rows) > limit else None
+    return model.browse([row[-1] for row in rows[:limit]]), next_cursor
+
+
+def approximate_count(model, domain, cap=KEYSET_COUNT_CAP):
+    """
+    Đếm số bản ghi, dừng lại ở ``cap``
+
+    :return: tuple (count, exact)
+    """
+    query = model._search(domain, limit=cap + 1)
+    if query.is_empty():
+        return 0, True
+    [(count,)] = model.env.execute_query(SQL("SELECT COUNT(*) FROM (%s) t", query.select(SQL("1"))))
+    return min(count, cap), count <= cap
+
+
+def keyset_pager(url, url_args, next_cursor, count, exact):
+    """Giá trị cho template ``library_keyset_pager``"""
+    args = {key: value for key, value in url_args.items() if value}
+    return {
+        'first_url': f"{url}?{urlencode(args, doseq=True)}" if args else url,
+        'next_url': next_cursor and f"{url}?{urlencode(dict(args, cursor=next_cursor), doseq=True)}",
+        'count': count,
+        'count_exact': exact,
+    }
@@ -0,0 +1,121 @@
+"""
+Đo thông lượng đánh số phiếu mượn khi nhiều tiến trình xác nhận cùng lúc
+
+Run it from ``odoo shell`` on a copy of the database::
+
+    from odoo.addons.entro_library.utils.sequence_benchmark import run_sequence_benchmark
+    run_sequence_benchmark(env, workers=8, per_worker=25)
+    run_sequence_benchmark(env, workers=1, per_worker=500, batch_size=500)
+
+Each worker numbers its own draft borrowings by transactions of
+``batch_size`` records, as ``action_confirm`` does, with the ``scan`` and
+then the ``counter`` allocator. Transactions failing on a concurrent update
+of the counter row are retried as the HTTP layer does, ``retries`` counts
+them. The borrowings are deleted afterwards and the borrowing counters are
+put back as they were, so no confirmation must run during the benchmark.
+"""
+import logging
+import threading
+import time
+
+from odoo import api
+from odoo.service.model import retrying
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+
+def _create_borrowings(env, count):
+    partner = env['res.partner'].search([], limit=1)
+    borrowings = env['library.borrowing'].create([{'borrower_id': partner.id} for _index in range(count)])
+    env.cr.commit()
+    return borrowings.ids
+
+
+def _get_counters(env):
+    return dict(env.execute_query(SQL(
+        "SELECT sequence_key, last_number FROM library_sequence_counter WHERE res_model = 'library.borrowing'"
+    )))
+
+
+def _cleanup(env, ids, counters):
+    env['library.borrowing'].browse(ids).sudo().unlink()
+    env.cr.execute(SQL("DELETE FROM library_sequence_counter WHERE res_model = 'library.borrowing'"))
+    if counters:
+        env.cr.execute(SQL(
+            "INSERT INTO library_sequence_counter (res_model, sequence_key, last_number) VALUES %s",
+            SQL(", ").join(
+                SQL("('library.borrowing', %s, %s)", sequence_key, last_number)
+                for sequence_key, last_number in counters.items()
+            ),
+        ))
+    env.cr.commit()
+    env.invalidate_all()
+
+
+def _worker(registry, uid, allocator, ids, batch_size, attempts, errors):
+    try:
+        for index in range(0, len(ids), batch_size):
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, {'sequence_allocator': allocator})
+
+                def number_batch(batch_ids=ids[index:index + batch_size]):
+                    attempts.append(batch_ids)
+                    borrowings = env['library.borrowing'].browse(batch_ids)
+                    borrowings.posted_before = True
+                    borrowings._set_next_sequences()
+
+                retrying(number_batch, env)
+    except Exception as error:
+        errors.append(error)
+
+
+def _run(env, allocator, workers, per_worker, batch_size):
+    counters = _get_counters(env)
+    ids = _create_borrowings(env, workers * per_worker)
+    chunks = [ids[index::workers] for index in range(workers)]
+    attempts = []
+    errors = []
+    threads = [
+        threading.Thread(target=_worker, args=(env.registry, env.uid, allocator, chunk, batch_size, attempts, errors))
+        for chunk in chunks
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    env.invalidate_all()
+    # Borrowings of a worker stopped by an error keep their draft name
+    names = [name for name in env['library.borrowing'].browse(ids).mapped('name') if name and name != '/']
+    batch_count = sum(-(-len(chunk) // batch_size) for chunk in chunks)
+    result = {
+        'allocator': allocator,
+        'workers': workers,
+        'batch_size': batch_size,
+        'confirmations': len(ids),
+        'numbered': len(names),
+        'seconds': round(elapsed, 3),
+        'per_second': round(len(names) / elapsed, 1) if elapsed else 0.0,
+        'duplicates': len(names) - len(set(names)),
+        'retries': len(attempts) - batch_count,
+        'errors': len(errors),
+    }
+    _cleanup(env, ids, counters)
+    return result
+
+
+def run_sequence_benchmark(env, workers=8, per_worker=25, batch_size=1, allocators=('scan', 'counter')):
+    """
+    Chạy benchmark với ``workers`` luồng song song cho từng chế độ cấp số
+
+    :return: list of result dicts, one per allocator
+    """
+    results = []
+    for allocator in allocators:
+        result = _run(env, allocator, workers, per_worker, batch_size)
+        _logger.info("Sequence benchmark: %s", result)
+        results.append(result)
+    return results
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 import base64
+import hashlib
 from odoo import http, _, exceptions, fields
 from odoo.http import request
+from odoo.tools import SQL
 from odoo.addons.website.controllers.main import QueryURL
+from odoo.addons.entro_library.utils.keyset_pager import (
+    approximate_count, keyset_enabled, keyset_pager, keyset_search,
+)
 from werkzeug.exceptions import NotFound
+from werkzeug.http import quote_etag
 from odoo.addons.portal.controllers.web import Home
 
 class Website(Home):
@@ -22,65 +28,9 @@ class LibraryWebsite(http.Controller):
     def library_home(self, **kwargs):
         """Trang chủ thư viện"""
 
-        # Get hero slides
-        hero_slides = request.env['library.website.slider'].search([
-            ('active', '=', True),
-            ('is_published', '=', True)
-        ], order='sequence, id')
-
-        # Get popular books (most borrowed)
-        # Use SQL to get books with borrow count
-        request.env.cr.execute("""
-            SELECT b.id, COUNT(bl.id) as borrow_count
-            FROM library_book b
-            LEFT JOIN library_borrowing_line bl ON bl.book_id = b.id
-            WHERE b.website_published = true AND b.active = true
-            GROUP BY b.id
-            HAVING COUNT(bl.id) > 0
-            ORDER BY borrow_count DESC
-            LIMIT 10
-        """)
-        popular_books_data = request.env.cr.fetchall()
-        popular_book_ids = [row[0] for row in popular_books_data]
-        popular_books = request.env['library.book'].browse(popular_book_ids)
-
-        # Get popular media (most viewed)
-        popular_media = request.env['library.media'].search([
-            ('website_published', '=', True),
-            ('active', '=', True),
-        ], limit=10, order='view_count desc')
-
-        # Get recent blog posts
-        blog_posts = request.env['blog.post'].search([
-            ('website_published', '=', True)
-        ], limit=3, order='published_date desc')
-
-        # Get statistics
-        total_books = request.env['library.book'].search_count([('active', '=', True)])
-        total_media = request.env['library.media'].search_count([('active', '=', True)])
-        total_members = request.env['res.partner'].search_count([('borrower_type_id', '!=', False)])
-
-        # Get visitor count from Google Analytics (cached value)
-        visitor_count = 0
-        try:
-            # Get cached value from system parameter (updated by scheduled action)
-            visitor_count = int(request.env['ir.config_parameter'].sudo().get_param(
-                'library.visitor_count', default=0
-            ))
-        except (ValueError, TypeError):
-            visitor_count = 0
-
-        values = {
-            'hero_slides': hero_slides,
-            'popular_books': popular_books,
-            'popular_media': popular_media,
-            'blog_posts': blog_posts,
-            'total_books': total_books,
-            'total_media': total_media,
-            'total_members': total_members,
-            'visitor_count': visitor_count,
-            'page_name': 'library_home',
-        }
+        # Statistics and carousels are cached per website/lang/visitor type
+        values = request.website._get_library_home_values()
+        values['page_name'] = 'library_home'
 
         return request.render("entro_library_website.library_home", values)
 
@@ -95,69 +45,39 @@ class LibraryWebsite(http.Controller):
         '/thu-vien/danh-muc/<model("library.website.category"):category>',
         '/thu-vien/danh-muc/<model("library.website.category"):category>/page/<int:page>',
     ], type='http', auth='public', website=True, sitemap=True)
-    def library_books(self, page=1, category=None, parent_slug=None, child_slug=None, search='', sortby=None, category_id=None, **kwargs):
+    def library_books(self, page=1, category=None, parent_slug=None, child_slug=None, search='', sortby=None, category_id=None, cursor=None, **kwargs):
         """Trang danh sách sách"""
 
         domain = [('website_published', '=', True)]
 
         # Filter by borrower type access control
-        if not request.env.user._is_public():
-            partner = request.env.user.partner_id
-            if partner.borrower_type_id:
-                # Show books that either:
-                # 1. Have no type restrictions (allowed_borrower_type_ids is empty), OR
-                # 2. Include the user's borrower type in allowed list
-                domain += [
-                    '|',
-                    ('allowed_borrower_type_ids', '=', False),
-                    ('allowed_borrower_type_ids', 'in', partner.borrower_type_id.id)
-                ]
-
-        # Tìm kiếm
+        domain += request.env['library.book']._get_website_access_domain()
+
+        # Tìm kiếm (không dấu)
         if search:
-            domain += [
-                '|', '|', '|',
-                ('name', 'ilike', search),
-                ('author_names', 'ilike', search),
-                ('keywords', 'ilike', search),
-                ('parallel_title', 'ilike', search),
-            ]
+            domain += request.env['library.book']._get_search_domain(search)
 
         # ========================================
         # Filter by library.book.category (hierarchical - for slug-based URLs)
         # ========================================
         book_category_id_list = []
+        all_book_category_ids = []
         selected_book_category = None
-
-        # Priority 1: Slug-based URL (SEO-friendly)
-        if child_slug:
-            # Child category slug (e.g., /thu-vien/phat-hoc/subcategory)
-            selected_book_category = request.env['library.book.category'].sudo().search([
-                ('slug', '=', child_slug),
-                ('parent_id.slug', '=', parent_slug)
-            ], limit=1)
+        BookCategory = request.env['library.book.category'].sudo()
+
+        # Priority 1: Slug-based URL (SEO-friendly), e.g. /thu-vien/phat-hoc
+        # or /thu-vien/phat-hoc/subcategory. The category and its whole
+        # subtree are resolved from the cached category tree.
+        if parent_slug:
+            book_category_id, subtree_ids = BookCategory._get_slug_subtree_ids(parent_slug, child_slug)
+            selected_book_category = BookCategory.browse(book_category_id)
             if selected_book_category:
-                book_category_id_list = [selected_book_category.id]
-        elif parent_slug:
-            # Parent category slug (e.g., /thu-vien/phat-hoc)
-            selected_book_category = request.env['library.book.category'].sudo().search([
-                ('slug', '=', parent_slug),
-                ('parent_id', '=', False)
-            ], limit=1)
-            if selected_book_category:
-                book_category_id_list = [selected_book_category.id]
+                book_category_id_list = [book_category_id]
+                all_book_category_ids = list(subtree_ids)
 
         # Apply library.book.category filter (including child categories)
         if book_category_id_list:
-            # Get all child categories recursively
-            all_book_category_ids = list(book_category_id_list)
-            book_categories = request.env['library.book.category'].sudo().browse(book_category_id_list)
-            for cat in book_categories:
-                if cat.child_ids:
-                    all_book_category_ids += cat.child_ids.ids
-                    # Recursive for nested children
-                    for child in cat.child_ids:
-                        all_book_category_ids += child.child_ids.ids
+            book_categories = BookCategory.browse(book_category_id_list)
             domain += [('book_category_id', 'in', all_book_category_ids)]
 
             # Apply access control based on category access_level
@@ -170,6 +90,10 @@ class LibraryWebsite(http.Controller):
                     if not request.env.user.has_group('entro_library.group_library_manager'):
                         raise exceptions.AccessError(_('Bạn không có quyền truy cập vào danh mục này.'))
 
+        # Facet counts ignore the website category filter itself so the
+        # sidebar keeps showing the other categories once one is checked
+        facet_domain = list(domain)
+
         # ========================================
         # Filter by library.website.category (for sidebar filter checkboxes)
         # ========================================
@@ -200,13 +124,16 @@ class LibraryWebsite(http.Controller):
             'name_desc': 'name desc',
             'author_asc': 'author_names asc, name',
             'author_desc': 'author_names desc, name',
+            'available_desc': 'available_quant_count desc, name',
         }
         if not sortby or sortby not in sort_options:
             sortby = 'date_desc'
-        order = sort_options[sortby]
+            # Rank by relevance when searching without an explicit sort
+            order = None if search else sort_options[sortby]
+        else:
+            order = sort_options[sortby]
 
         Book = request.env['library.book']
-        books_count = Book.search_count(domain)
 
         # Phân trang
         ppg = 20  # books per page
@@ -229,52 +156,44 @@ class LibraryWebsite(http.Controller):
         if website_category_id_list:
             url_args['category_id'] = website_category_id_list
 
-        pager = request.website.pager(
-            url=url,
-            url_args=url_args,
-            total=books_count,
-            page=page,
-            step=ppg,
-        )
-
-        books = Book.search(
-            domain,
-            limit=ppg,
-            offset=pager['offset'],
-            order=order
-        )
+        # Keyset mode seeks after the last record of the previous page instead
+        # of using OFFSET, with a capped count (relevance ranking needs OFFSET)
+        books = keyset = None
+        if order and keyset_enabled(request.env, cursor, page):
+            books, next_cursor = keyset_search(Book, domain, order, ppg, cursor)
+        if books is not None:
+            books_count, count_exact = approximate_count(Book, domain)
+            pager = None
+            keyset = keyset_pager(url, url_args, next_cursor, books_count, count_exact)
+        else:
+            books_count = Book.search_count(domain)
+            pager = request.website.pager(
+                url=url,
+                url_args=url_args,
+                total=books_count,
+                page=page,
+                step=ppg,
+            )
+            books = Book._search_ranked(
+                domain,
+                search=search,
+                limit=ppg,
+                offset=pager['offset'],
+                order=order
+            )
 
-        # Load library.website.category for sidebar filters
-        # Only show website categories that have books in the current book.category context
+        # Load library.website.category for sidebar filters, with the number
+        # of matching books per category computed in a single grouped query
+        facet_counts = Book._get_facet_counts(facet_domain, facets=['website_category'])
         website_category_domain = [
             ('active', '=', True),
             ('category_type', 'in', ['book', 'both'])
         ]
 
-        # If a book.category is selected (via slug), filter website_categories
-        # to only show those that have books in this book.category
+        # If a book.category is selected (via slug), only show the website
+        # categories that have books in this book.category
         if book_category_id_list:
-            # Get all child categories recursively
-            all_book_category_ids = list(book_category_id_list)
-            book_categories = request.env['library.book.category'].sudo().browse(book_category_id_list)
-            for cat in book_categories:
-                if cat.child_ids:
-                    all_book_category_ids += cat.child_ids.ids
-                    for child in cat.child_ids:
-                        all_book_category_ids += child.child_ids.ids
-
-            # Find all website_category_ids that have books in this book.category
-            books_in_category = request.env['library.book'].sudo().search([
-                ('book_category_id', 'in', all_book_category_ids),
-                ('website_category_id', '!=', False)
-            ])
-            available_website_category_ids = books_in_category.mapped('website_category_id').ids
-
-            if available_website_category_ids:
-                website_category_domain.append(('id', 'in', available_website_category_ids))
-            else:
-                # No books with website_category in this book.category, show empty list
-                website_category_domain.append(('id', '=', False))
+            website_category_domain.append(('id', 'in', list(facet_counts['website_category'])))
 
         website_categories = request.env['library.website.category'].search(
             website_category_domain,
@@ -294,6 +213,7 @@ class LibraryWebsite(http.Controller):
             'books': books,
             'books_count': books_count,
             'pager': pager,
+            'keyset': keyset,
             'search': search,
             'category': category,
 
@@ -304,6 +224,7 @@ class LibraryWebsite(http.Controller):
             # library.website.category variables (sidebar filters)
             'website_category_id_list': website_category_id_list,
             'website_categories': website_categories,
+            'facet_counts': facet_counts,
 
             'page_name': 'library_books',
             'keep': keep,
@@ -323,21 +244,25 @@ class LibraryWebsite(http.Controller):
             return request.redirect('/thu-vien')
 
         # Check borrower type access
-        if not request.env.user._is_public():
-            partner = request.env.user.partner_id
-            if partner.borrower_type_id and book.allowed_borrower_type_ids:
-                # If book has type restrictions, check if user's type is allowed
-                if partner.borrower_type_id not in book.allowed_borrower_type_ids:
-                    return request.redirect('/thu-vien')
+        if not book._is_website_accessible():
+            return request.redirect('/thu-vien')
 
-        # Tìm sách liên quan (cùng danh mục hoặc cùng tác giả)
-        related_books = request.env['library.book'].search([
+        # Sách liên quan: đọc từ bảng gợi ý dựng sẵn, nếu chưa có thì
+        # tìm sách cùng danh mục hoặc cùng tác giả
+        related_domain = [
             ('website_published', '=', True),
-            ('id', '!=', book.id),
-            '|',
-            ('category_id', '=', book.category_id.id),
-            ('author_ids', 'in', book.author_ids.ids),
-        ], limit=6)
+            ('active', '=', True),
+            *request.env['library.book']._get_website_access_domain(),
+        ]
+        related_books = request.env['library.book.related']._get_related(book, limit=6, domain=related_domain)
+        if not related_books:
+            related_books = request.env['library.book'].search([
+                *related_domain,
+                ('id', '!=', book.id),
+                '|',
+                ('category_id', '=', book.category_id.id),
+                ('author_ids', 'in', book.author_ids.ids),
+            ], limit=6)
 
         # Get meta tags
         meta_data = book._prepare_meta_tags()
@@ -366,7 +291,10 @@ class LibraryWebsite(http.Controller):
         }
         values.update(meta_data)
 
-        return request.render("entro_library_website.library_book_detail", values)
+        etag = self._get_detail_etag(
+            book, book.book_image_ids, book.author_ids, book.media_id, related_books,
+        )
+        return self._conditional_render("entro_library_website.library_book_detail", values, etag)
 
     @http.route(['/thu-vien/them-vao-gio'], type='json', auth='user', website=True)
     def add_to_borrowing_cart(self, book_id, **kwargs):
@@ -405,73 +333,39 @@ class LibraryWebsite(http.Controller):
         '/media/page/<int:page>',
         '/media/<path:menu_path>/page/<int:page>',
     ], type='http', auth='public', website=True, sitemap=True)
-    def library_media_list(self, page=1, parent_slug=None, child_slug=None, category=None, menu_path=None, search='', media_type=None, category_id=None, sortby=None, **kwargs):
+    def library_media_list(self, page=1, parent_slug=None, child_slug=None, category=None, menu_path=None, search='', media_type=None, category_id=None, sortby=None, cursor=None, **kwargs):
         """Trang danh sách phương tiện"""
 
         domain = [('website_published', '=', True), ('active', '=', True)]
 
-        # Filter by borrower type access control
-        if not request.env.user._is_public():
-            partner = request.env.user.partner_id
-            if partner.borrower_type_id:
-                domain += [
-                    '|',
-                    ('allowed_borrower_type_ids', '=', False),
-                    ('allowed_borrower_type_ids', 'in', partner.borrower_type_id.id)
-                ]
-
-        # Filter by access level
-        if request.env.user._is_public():
-            domain += [('access_level', '=', 'public')]
-        else:
-            # Logged in users can see public and members content
-            domain += [('access_level', 'in', ['public', 'members'])]
+        # Filter by borrower type and access level
+        domain += request.env['library.media']._get_website_access_domain()
 
-        # Search
+        # Search (accent-insensitive)
         if search:
-            domain += [
-                '|', '|', '|',
-                ('name', 'ilike', search),
-                ('author', 'ilike', search),
-                ('keywords', 'ilike', search),
-                ('description', 'ilike', search),
-            ]
+            domain += request.env['library.media']._get_search_domain(search)
 
         # ========================================
         # Filter by library.media.category (hierarchical - for slug-based URLs)
         # ========================================
         media_category_id_list = []
+        all_media_category_ids = []
         selected_media_category = None
-
-        # Priority 1: Slug-based URL (SEO-friendly)
-        if child_slug:
-            # Child category slug (e.g., /thu-vien/media/thien-vipassana/phap-thoai)
-            selected_media_category = request.env['library.media.category'].sudo().search([
-                ('slug', '=', child_slug),
-                ('parent_id.slug', '=', parent_slug)
-            ], limit=1)
-            if selected_media_category:
-                media_category_id_list = [selected_media_category.id]
-        elif parent_slug:
-            # Parent category slug (e.g., /thu-vien/media/phat-hoc)
-            selected_media_category = request.env['library.media.category'].sudo().search([
-                ('slug', '=', parent_slug),
-                ('parent_id', '=', False)
-            ], limit=1)
+        MediaCategory = request.env['library.media.category'].sudo()
+
+        # Priority 1: Slug-based URL (SEO-friendly), e.g. /thu-vien/media/phat-hoc
+        # or /thu-vien/media/thien-vipassana/phap-thoai. The category and its
+        # whole subtree are resolved from the cached category tree.
+        if parent_slug:
+            media_category_id, subtree_ids = MediaCategory._get_slug_subtree_ids(parent_slug, child_slug)
+            selected_media_category = MediaCategory.browse(media_category_id)
             if selected_media_category:
-                media_category_id_list = [selected_media_category.id]
+                media_category_id_list = [media_category_id]
+                all_media_category_ids = list(subtree_ids)
 
         # Apply library.media.category filter (including child categories)
         if media_category_id_list:
-            # Get all child categories recursively
-            all_media_category_ids = list(media_category_id_list)
-            media_categories = request.env['library.media.category'].sudo().browse(media_category_id_list)
-            for cat in media_categories:
-                if cat.child_ids:
-                    all_media_category_ids += cat.child_ids.ids
-                    # Recursive for nested children
-                    for child in cat.child_ids:
-                        all_media_category_ids += child.child_ids.ids
+            media_categories = MediaCategory.browse(media_category_id_list)
             domain += [('category_id', 'in', all_media_category_ids)]
 
             # Apply access control based on category access_level
@@ -484,6 +378,10 @@ class LibraryWebsite(http.Controller):
                     if not request.env.user.has_group('entro_library.group_library_manager'):
                         raise exceptions.AccessError(_('Bạn không có quyền truy cập vào danh mục này.'))
 
+        # Facet counts ignore the website category filter itself so the
+        # sidebar keeps showing the other categories once one is checked
+        facet_domain = list(domain)
+
         # ========================================
         # Filter by library.website.category (for sidebar filter checkboxes)
         # ========================================
@@ -517,10 +415,12 @@ class LibraryWebsite(http.Controller):
         }
         if not sortby or sortby not in sort_options:
             sortby = 'date_desc'
-        order = sort_options[sortby]
+            # Rank by relevance when searching without an explicit sort
+            order = None if search else sort_options[sortby]
+        else:
+            order = sort_options[sortby]
 
         Media = request.env['library.media']
-        media_count = Media.search_count(domain)
 
         # Pagination
         ppg = 12  # media per page
@@ -546,52 +446,44 @@ class LibraryWebsite(http.Controller):
         if website_category_id_list:
             url_args['category_id'] = website_category_id_list
 
-        pager = request.website.pager(
-            url=url,
-            url_args=url_args,
-            total=media_count,
-            page=page,
-            step=ppg,
-        )
-
-        media_items = Media.search(
-            domain,
-            limit=ppg,
-            offset=pager['offset'],
-            order=order
-        )
+        # Keyset mode seeks after the last record of the previous page instead
+        # of using OFFSET, with a capped count (relevance ranking needs OFFSET)
+        media_items = keyset = None
+        if order and keyset_enabled(request.env, cursor, page):
+            media_items, next_cursor = keyset_search(Media, domain, order, ppg, cursor)
+        if media_items is not None:
+            media_count, count_exact = approximate_count(Media, domain)
+            pager = None
+            keyset = keyset_pager(url, url_args, next_cursor, media_count, count_exact)
+        else:
+            media_count = Media.search_count(domain)
+            pager = request.website.pager(
+                url=url,
+                url_args=url_args,
+                total=media_count,
+                page=page,
+                step=ppg,
+            )
+            media_items = Media._search_ranked(
+                domain,
+                search=search,
+                limit=ppg,
+                offset=pager['offset'],
+                order=order
+            )
 
-        # Load library.website.category for sidebar filters
-        # Only show website categories that have media in the current media.category context
+        # Load library.website.category for sidebar filters, with the number
+        # of matching media per category computed in a single grouped query
+        facet_counts = Media._get_facet_counts(facet_domain, facets=['website_category'])
         website_category_domain = [
             ('active', '=', True),
             ('category_type', 'in', ['media', 'both'])
         ]
 
-        # If a media.category is selected (via slug), filter website_categories
-        # to only show those that have media in this media.category
+        # If a media.category is selected (via slug), only show the website
+        # categories that have media in this media.category
         if media_category_id_list:
-            # Get all child categories recursively
-            all_media_category_ids = list(media_category_id_list)
-            media_categories = request.env['library.media.category'].sudo().browse(media_category_id_list)
-            for cat in media_categories:
-                if cat.child_ids:
-                    all_media_category_ids += cat.child_ids.ids
-                    for child in cat.child_ids:
-                        all_media_category_ids += child.child_ids.ids
-
-            # Find all website_category_ids that have media in this media.category
-            media_in_category = request.env['library.media'].sudo().search([
-                ('category_id', 'in', all_media_category_ids),
-                ('website_category_id', '!=', False)
-            ])
-            available_website_category_ids = media_in_category.mapped('website_category_id').ids
-
-            if available_website_category_ids:
-                website_category_domain.append(('id', 'in', available_website_category_ids))
-            else:
-                # No media with website_category in this media.category, show empty list
-                website_category_domain.append(('id', '=', False))
+            website_category_domain.append(('id', 'in', list(facet_counts['website_category'])))
 
         website_categories = request.env['library.website.category'].search(
             website_category_domain,
@@ -611,6 +503,7 @@ class LibraryWebsite(http.Controller):
             'media_items': media_items,
             'media_count': media_count,
             'pager': pager,
+            'keyset': keyset,
             'search': search,
             'category': category,
             'media_type': media_type,
@@ -622,6 +515,7 @@ class LibraryWebsite(http.Controller):
             # library.website.category variables (sidebar filters)
             'website_category_id_list': website_category_id_list,
             'website_categories': website_categories,
+            'facet_counts': facet_counts,
 
             'page_name': 'library_media',
             'keep': keep,
@@ -644,84 +538,136 @@ class LibraryWebsite(http.Controller):
             return request.redirect('/media')
 
         # Check borrower type access
-        if not request.env.user._is_public():
-            partner = request.env.user.partner_id
-            if partner.borrower_type_id and media.allowed_borrower_type_ids:
-                if partner.borrower_type_id not in media.allowed_borrower_type_ids:
-                    return request.redirect('/media')
+        if not media._is_website_accessible():
+            return request.redirect('/media')
 
         # Check access level
         if request.env.user._is_public() and media.access_level != 'public':
             return request.redirect('/web/login?redirect=/media/%s' % media_id)
 
-        # Increment view count
-        media.sudo().write({'view_count': media.view_count + 1})
-
-        # Log view
-        if not request.env.user._is_public():
-            try:
-                request.env['library.media.view.log'].sudo().create({
-                    'media_id': media.id,
-                    'user_id': request.env.user.id,
-                })
-            except Exception:
-                pass  # Ignore if log creation fails
-
-        # Find related media (same category or same type)
+        # Related media from the precomputed recommendations, falling back
+        # to the same category or type when the media has none yet
         related_domain = [
             ('website_published', '=', True),
             ('active', '=', True),
-            ('id', '!=', media.id),
         ]
-
-        if request.env.user._is_public():
-            related_domain += [('access_level', '=', 'public')]
-        else:
-            related_domain += [('access_level', 'in', ['public', 'members'])]
-
-        related_media = request.env['library.media'].search([
-            *related_domain,
-            '|',
-            ('category_id', '=', media.category_id.id),
-            ('media_type', '=', media.media_type),
-        ], limit=6, order='view_count desc')
+        related_domain += request.env['library.media']._get_website_access_domain()
+
+        related_media = request.env['library.media.related']._get_related(media, limit=6, domain=related_domain)
+        if not related_media:
+            related_media = request.env['library.media'].search([
+                *related_domain,
+                ('id', '!=', media.id),
+                '|',
+                ('category_id', '=', media.category_id.id),
+                ('media_type', '=', media.media_type),
+            ], limit=6, order='view_count desc')
 
         # Get meta tags
         meta_data = media._prepare_meta_tags()
 
-        # Detect YouTube/Vimeo URLs
-        youtube_id = None
-        vimeo_id = None
-        if media.storage_type == 'url' and media.file_url:
-            import re
-            # YouTube detection
-            youtube_patterns = [
-                r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\s]+)',
-                r'youtube\.com\/embed\/([^&\s]+)',
-            ]
-            for pattern in youtube_patterns:
-                match = re.search(pattern, media.file_url)
-                if match:
-                    youtube_id = match.group(1)
-                    break
-
-            # Vimeo detection
-            vimeo_match = re.search(r'vimeo\.com\/(\d+)', media.file_url)
-            if vimeo_match:
-                vimeo_id = vimeo_match.group(1)
-
         values = {
             'media': media,
             'related_media': related_media,
             'is_public_user': request.env.user._is_public(),
             'main_object': media,
             'page_name': 'media_detail',
-            'youtube_id': youtube_id,
-            'vimeo_id': vimeo_id,
         }
         values.update(meta_data)
 
-        return request.render("entro_library_website.library_media_detail", values)
+        # The view is counted by the page (see ``library_media_view``), so the
+        # rendering has no side effect and can be revalidated
+        etag = self._get_detail_etag(media, media.book_ids, related_media)
+        return self._conditional_render("entro_library_website.library_media_detail", values, etag)
+
+    @http.route('/media/<int:media_id>/luot-xem', type='http', auth='public', methods=['POST'], csrf=False)
+    def library_media_view(self, media_id, **kwargs):
+        """Đếm lượt xem, gọi bởi trang chi tiết sau khi tải"""
+        media = request.env['library.media'].browse(media_id)
+        if media.exists() and media.website_published and media.active and media._is_website_accessible():
+            # Count the view (and log it for members) without locking the
+            # media, the buffered hits are applied in batch by a cron
+            user_id = None if request.env.user._is_public() else request.env.user.id
+            request.env['library.media.hit'].sudo()._log_hit(media.id, 'view', user_id)
+        return request.make_response('', status=204)
+
+    def _get_detail_etag(self, *records):
+        """Validator của trang chi tiết, thay đổi khi một bản ghi hiển thị,
+        giao diện website hoặc ngôn ngữ thay đổi"""
+        registry = request.env.registry
+        parts = [
+            registry.registry_sequence,
+            registry.cache_sequences.get('templates'),
+            request.website.id,
+            request.website.write_date,
+            request.lang.code,
+        ]
+        for recordset in records:
+            parts.extend((record._name, record.id, record.write_date) for record in recordset)
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def _conditional_render(self, template, values, etag):
+        """Render ``template``, or answer 304 when an anonymous visitor
+        revalidates a page that did not change. Members get pages with their
+        own data (cart, borrowings) and are always rendered. The pages hold
+        the session's CSRF token, so only the browser may keep them."""
+        if not request.env.user._is_public():
+            return request.render(template, values)
+        headers = [('ETag', quote_etag(etag)), ('Cache-Control', 'private, no-cache')]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+        response = request.render(template, values)
+        response.headers.extend(headers)
+        return response
+
+    def _check_media_file_access(self, media):
+        """Redirect response if the visitor may not get the file of ``media``, else None"""
+        if not media.exists() or not media.website_published or not media.active:
+            return request.redirect('/media')
+
+        # bin_size avoids loading the file content just to test its presence
+        if media.storage_type != 'file' or not media.with_context(bin_size=True).file:
+            return request.redirect('/media/%s' % media.id)
+
+        # Check borrower type access
+        if not media._is_website_accessible():
+            return request.redirect('/media')
+
+        # Check access level
+        if request.env.user._is_public() and media.access_level != 'public':
+            return request.redirect('/web/login?redirect=/media/%s' % media.id)
+
+        return None
+
+    def _get_media_file_response(self, media, as_attachment=False, field='file'):
+        """Stream the file ``field`` of ``media`` from its attachment.
+
+        ir.binary serves filestore attachments by path (or through
+        X-Sendfile/X-Accel-Redirect when enabled) in chunks, with ``Range``/206,
+        ``ETag`` and ``If-None-Match`` handled by werkzeug, so the worker never
+        holds the payload in memory.
+        """
+        stream = request.env['ir.binary']._get_stream_from(
+            media.sudo(), field,
+            filename=media.filename,
+            default_mimetype=media.mime_type or 'application/octet-stream',
+        )
+        return stream.get_response(as_attachment=as_attachment)
+
+    @http.route(['/media/<int:media_id>/phat'], type='http', auth='public', website=True, sitemap=False)
+    def library_media_stream(self, media_id, **kwargs):
+        """Stream media file for the audio/video players (seekable)"""
+
+        media = request.env['library.media'].browse(media_id)
+        redirect = self._check_media_file_access(media)
+        if redirect:
+            return redirect
+
+        # Play the compressed rendition when the background job made one,
+        # downloads keep the original file
+        if media.stream_mimetype and media.sudo().with_context(bin_size=True).stream_file:
+            return self._get_media_file_response(media, field='stream_file')
+        return self._get_media_file_response(media)
 
     @http.route(['/media/<int:media_id>/tai-xuong'], type='http', auth='public', website=True)
     def library_media_download(self, media_id, **kwargs):
@@ -729,31 +675,20 @@ class LibraryWebsite(http.Controller):
 
         media = request.env['library.media'].browse(media_id)
 
-        if not media.exists() or not media.website_published or not media.active:
-            return request.redirect('/media')
-
-        if not media.is_downloadable:
+        if media.exists() and not media.is_downloadable:
             return request.render("website.403")
 
-        if media.storage_type != 'file' or not media.file:
-            return request.redirect('/media/%s' % media_id)
+        redirect = self._check_media_file_access(media)
+        if redirect:
+            return redirect
 
-        # Check access level
-        if request.env.user._is_public() and media.access_level != 'public':
-            return request.redirect('/web/login?redirect=/media/%s' % media_id)
+        # Count the download, applied in batch by a cron. Resumed downloads
+        # (Range not starting at 0) are not counted again.
+        range_header = request.httprequest.headers.get('Range', '')
+        if not range_header or range_header.replace(' ', '').startswith('bytes=0-'):
+            request.env['library.media.hit'].sudo()._log_hit(media.id, 'download')
 
-        # Increment download count
-        media.sudo().write({'download_count': media.download_count + 1})
-
-        # Return file
-        return request.make_response(
-            base64.b64decode(media.file),
-            headers=[
-                ('Content-Type', media.mime_type or 'application/octet-stream'),
-                ('Content-Disposition',
-                 f'attachment; filename="{media.filename}"'),
-            ]
-        )
+        return self._get_media_file_response(media, as_attachment=True)
 
     # ====================================
     # MEDIA ROUTES BY BORROWER TYPE
@@ -768,21 +703,12 @@ class LibraryWebsite(http.Controller):
             ('allowed_borrower_type_ids', 'in', borrower_type.id)
         ]
 
-        # Filter by access level
-        if request.env.user._is_public():
-            domain += [('access_level', '=', 'public')]
-        else:
-            domain += [('access_level', 'in', ['public', 'members'])]
+        # Filter by the visitor's borrower type and access level
+        domain += request.env['library.media']._get_website_access_domain()
 
-        # Search
+        # Search (accent-insensitive)
         if search:
-            domain += [
-                '|', '|', '|',
-                ('name', 'ilike', search),
-                ('author', 'ilike', search),
-                ('keywords', 'ilike', search),
-                ('description', 'ilike', search),
-            ]
+            domain += request.env['library.media']._get_search_domain(search)
 
         # Sorting
         sort_options = {
@@ -795,7 +721,10 @@ class LibraryWebsite(http.Controller):
         }
         if not sortby or sortby not in sort_options:
             sortby = 'date_desc'
-        order = sort_options[sortby]
+            # Rank by relevance when searching without an explicit sort
+            order = None if search else sort_options[sortby]
+        else:
+            order = sort_options[sortby]
 
         Media = request.env['library.media']
         media_count = Media.search_count(domain)
@@ -812,8 +741,9 @@ class LibraryWebsite(http.Controller):
             step=ppg,
         )
 
-        media_items = Media.search(
+        media_items = Media._search_ranked(
             domain,
+            search=search,
             limit=ppg,
             offset=pager['offset'],
             order=order
@@ -872,21 +802,12 @@ class LibraryWebsite(http.Controller):
             ('allowed_borrower_type_ids', 'not in', exclude_ids)
         ]
 
-        # Filter by access level
-        if request.env.user._is_public():
-            domain += [('access_level', '=', 'public')]
-        else:
-            domain += [('access_level', 'in', ['public', 'members'])]
+        # Filter by the visitor's borrower type and access level
+        domain += request.env['library.media']._get_website_access_domain()
 
-        # Search
+        # Search (accent-insensitive)
         if search:
-            domain += [
-                '|', '|', '|',
-                ('name', 'ilike', search),
-                ('author', 'ilike', search),
-                ('keywords', 'ilike', search),
-                ('description', 'ilike', search),
-            ]
+            domain += request.env['library.media']._get_search_domain(search)
 
         # Sorting
         sort_options = {
@@ -899,7 +820,10 @@ class LibraryWebsite(http.Controller):
         }
         if not sortby or sortby not in sort_options:
             sortby = 'date_desc'
-        order = sort_options[sortby]
+            # Rank by relevance when searching without an explicit sort
+            order = None if search else sort_options[sortby]
+        else:
+            order = sort_options[sortby]
 
         Media = request.env['library.media']
         media_count = Media.search_count(domain)
@@ -916,8 +840,9 @@ class LibraryWebsite(http.Controller):
             step=ppg,
         )
 
-        media_items = Media.search(
+        media_items = Media._search_ranked(
             domain,
+            search=search,
             limit=ppg,
             offset=pager['offset'],
             order=order
@@ -1017,43 +942,14 @@ class LibraryWebsite(http.Controller):
         book_domain = [('website_published', '=', True)]
         media_domain = [('website_published', '=', True), ('active', '=', True)]
 
-        # Filter by borrower type access control
-        if not request.env.user._is_public():
-            partner = request.env.user.partner_id
-            if partner.borrower_type_id:
-                book_domain += [
-                    '|',
-                    ('allowed_borrower_type_ids', '=', False),
-                    ('allowed_borrower_type_ids', 'in', partner.borrower_type_id.id)
-                ]
-                media_domain += [
-                    '|',
-                    ('allowed_borrower_type_ids', '=', False),
-                    ('allowed_borrower_type_ids', 'in', partner.borrower_type_id.id)
-                ]
-
-        # Filter by access level for media
-        if request.env.user._is_public():
-            media_domain += [('access_level', '=', 'public')]
-        else:
-            media_domain += [('access_level', 'in', ['public', 'members'])]
+        # Filter by borrower type access control (and access level for media)
+        book_domain += request.env['library.book']._get_website_access_domain()
+        media_domain += request.env['library.media']._get_website_access_domain()
 
-        # Search
+        # Search (accent-insensitive)
         if search:
-            book_domain += [
-                '|', '|', '|',
-                ('name', 'ilike', search),
-                ('author_names', 'ilike', search),
-                ('keywords', 'ilike', search),
-                ('parallel_title', 'ilike', search),
-            ]
-            media_domain += [
-                '|', '|', '|',
-                ('name', 'ilike', search),
-                ('author', 'ilike', search),
-                ('keywords', 'ilike', search),
-                ('description', 'ilike', search),
-            ]
+            book_domain += request.env['library.book']._get_search_domain(search)
+            media_domain += request.env['library.media']._get_search_domain(search)
 
         # Filter by category (support multiple categories via checkbox)
         category_id_list = []
@@ -1142,46 +1038,39 @@ class LibraryWebsite(http.Controller):
             step=ppg,
         )
 
-        # Fetch mixed results
+        # Fetch results
         all_items = []
 
-        if item_type != 'media' and books_count > 0:
+        if item_type == 'book' and books_count > 0:
             books = Book.search(
                 book_domain,
-                limit=ppg if item_type == 'book' else books_count,
-                offset=pager['offset'] if item_type == 'book' else 0,
+                limit=ppg,
+                offset=pager['offset'],
                 order=book_order
             )
-            for book in books:
-                all_items.append({
-                    'type': 'book',
-                    'item': book,
-                    'date': book.registration_date or fields.Date.today(),
-                })
+            all_items = [{
+                'type': 'book',
+                'item': book,
+                'date': book.registration_date or fields.Date.today(),
+            } for book in books]
 
-        if item_type != 'book' and media_count > 0:
+        elif item_type == 'media' and media_count > 0:
             media_items = Media.search(
                 media_domain,
-                limit=ppg if item_type == 'media' else media_count,
-                offset=pager['offset'] if item_type == 'media' else 0,
+                limit=ppg,
+                offset=pager['offset'],
                 order=media_order
             )
-            for media in media_items:
-                all_items.append({
-                    'type': 'media',
-                    'item': media,
-                    'date': media.create_date.date() if media.create_date else fields.Date.today(),
-                })
+            all_items = [{
+                'type': 'media',
+                'item': media,
+                'date': media.create_date.date() if media.create_date else fields.Date.today(),
+            } for media in media_items]
 
-        # Sort mixed items
-        if not item_type:
-            if sortby in ['date_desc', 'name_desc']:
-                all_items.sort(key=lambda x: x['date'] if sortby == 'date_desc' else x['item'].name, reverse=True)
-            else:
-                all_items.sort(key=lambda x: x['date'] if sortby == 'date_asc' else x['item'].name)
-
-            # Apply pagination to mixed results
-            all_items = all_items[pager['offset']:pager['offset'] + ppg]
+        elif not item_type and total_count > 0:
+            # Interleave books and media in the database, only the page is loaded
+            all_items = self._get_merged_catalog_page(
+                book_domain, media_domain, sortby, pager['offset'], ppg)
 
         # Get website categories (both book and media)
         website_categories = request.env['library.website.category'].search(
@@ -1216,6 +1105,65 @@ class LibraryWebsite(http.Controller):
 
         return request.render("entro_library_website.unified_catalog", values)
 
+    def _get_merged_catalog_page(self, book_domain, media_domain, sortby, offset, limit):
+        """Return one page of books and media interleaved by ``sortby``.
+
+        Both searches are combined with UNION ALL so that the sort, OFFSET and
+        LIMIT run in PostgreSQL; only the records of the page are browsed.
+        """
+        Book = request.env['library.book']
+        Media = request.env['library.media']
+
+        book_query = Book._search(book_domain)
+        media_query = Media._search(media_domain)
+        book_select = book_query.select(
+            SQL("'book' AS item_type"),
+            SQL("%s AS id", Book._field_to_sql(Book._table, 'id', book_query)),
+            SQL("%s AS sort_date", Book._field_to_sql(Book._table, 'registration_date', book_query)),
+            SQL("%s AS sort_name", Book._field_to_sql(Book._table, 'name', book_query)),
+        )
+        media_select = media_query.select(
+            SQL("'media' AS item_type"),
+            SQL("%s AS id", Media._field_to_sql(Media._table, 'id', media_query)),
+            SQL("%s::date AS sort_date", Media._field_to_sql(Media._table, 'create_date', media_query)),
+            SQL("%s AS sort_name", Media._field_to_sql(Media._table, 'name', media_query)),
+        )
+
+        merged_orders = {
+            'date_desc': "sort_date DESC, sort_name",
+            'date_asc': "sort_date ASC, sort_name",
+            'name_asc': "sort_name ASC",
+            'name_desc': "sort_name DESC",
+        }
+        rows = request.env.execute_query(SQL(
+            """
+            SELECT item_type, id FROM ((%s) UNION ALL (%s)) AS catalog
+            ORDER BY %s, item_type, id
+            LIMIT %s OFFSET %s
+            """,
+            book_select,
+            media_select,
+            SQL(merged_orders.get(sortby, merged_orders['date_desc'])),
+            limit,
+            offset,
+        ))
+
+        # Browse each model once so the page is prefetched in two queries
+        books = Book.browse([item_id for item_type, item_id in rows if item_type == 'book'])
+        medias = Media.browse([item_id for item_type, item_id in rows if item_type == 'media'])
+        records = {('book', book.id): book for book in books}
+        records.update({('media', media.id): media for media in medias})
+
+        all_items = []
+        for item_type, item_id in rows:
+            record = records[(item_type, item_id)]
+            if item_type == 'book':
+                date = record.registration_date or fields.Date.today()
+            else:
+                date = record.create_date.date() if record.create_date else fields.Date.today()
+            all_items.append({'type': item_type, 'item': record, 'date': date})
+        return all_items
+
     # ====================================
     # RESOURCE REQUEST ROUTES
     # ====================================
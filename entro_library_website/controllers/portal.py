@@ -3,6 +3,9 @@ from odoo import http, _
 from odoo.http import request
 from odoo.addons.portal.controllers.portal import CustomerPortal, pager as portal_pager
 from odoo.exceptions import AccessError, MissingError
+from odoo.addons.entro_library.utils.keyset_pager import (
+    approximate_count, keyset_enabled, keyset_pager, keyset_search,
+)
 
 
 class LibraryPortal(CustomerPortal):
@@ -31,12 +34,38 @@ class LibraryPortal(CustomerPortal):
 
         return values
 
+    def _get_library_page(self, Model, domain, order, url, url_args, page=1, cursor=None):
+        """
+        Một trang danh sách portal
+
+        Keyset (seek) pagination with a capped count when enabled, see
+        ``entro_library.utils.keyset_pager``, otherwise the standard portal pager.
+
+        :return: tuple (records, pager, keyset)
+        """
+        step = self._items_per_page
+        if keyset_enabled(request.env, cursor, page):
+            records, next_cursor = keyset_search(Model, domain, order, step, cursor)
+            if records is not None:
+                count, exact = approximate_count(Model, domain)
+                return records, None, keyset_pager(url, url_args, next_cursor, count, exact)
+
+        pager = portal_pager(
+            url=url,
+            url_args=url_args,
+            total=Model.search_count(domain),
+            page=page,
+            step=step
+        )
+        records = Model.search(domain, order=order, limit=step, offset=pager['offset'])
+        return records, pager, None
+
     # ========== MY BORROWINGS ==========
 
     @http.route(['/my/borrowings', '/my/borrowings/page/<int:page>'],
                 type='http', auth="user", website=True)
     def portal_my_borrowings(self, page=1, date_begin=None, date_end=None,
-                             sortby=None, filterby=None, **kw):
+                             sortby=None, filterby=None, cursor=None, **kw):
         """Danh sách phiếu mượn của tôi"""
 
         values = self._prepare_portal_layout_values()
@@ -70,25 +99,14 @@ class LibraryPortal(CustomerPortal):
             sortby = 'date'
         order = searchbar_sortings[sortby]['order']
 
-        # Count
-        borrowing_count = LibraryBorrowing.search_count(domain)
-
-        # Pager
-        pager = portal_pager(
+        # Keyset or OFFSET page
+        borrowings, pager, keyset = self._get_library_page(
+            LibraryBorrowing, domain, order,
             url="/my/borrowings",
             url_args={'date_begin': date_begin, 'date_end': date_end,
                      'sortby': sortby, 'filterby': filterby},
-            total=borrowing_count,
             page=page,
-            step=self._items_per_page
-        )
-
-        # Get borrowings
-        borrowings = LibraryBorrowing.search(
-            domain,
-            order=order,
-            limit=self._items_per_page,
-            offset=pager['offset']
+            cursor=cursor,
         )
 
         values.update({
@@ -96,6 +114,7 @@ class LibraryPortal(CustomerPortal):
             'borrowings': borrowings,
             'page_name': 'borrowing',
             'pager': pager,
+            'keyset': keyset,
             'default_url': '/my/borrowings',
             'searchbar_sortings': searchbar_sortings,
             'searchbar_filters': searchbar_filters,
@@ -173,7 +192,7 @@ class LibraryPortal(CustomerPortal):
 
     @http.route(['/my/reservations', '/my/reservations/page/<int:page>'],
                 type='http', auth="user", website=True)
-    def portal_my_reservations(self, page=1, sortby=None, filterby=None, **kw):
+    def portal_my_reservations(self, page=1, sortby=None, filterby=None, cursor=None, **kw):
         """Danh sách đặt trước của tôi"""
 
         values = self._prepare_portal_layout_values()
@@ -205,30 +224,20 @@ class LibraryPortal(CustomerPortal):
             sortby = 'date'
         order = searchbar_sortings[sortby]['order']
 
-        # Count
-        reservation_count = Reservation.search_count(domain)
-
-        # Pager
-        pager = portal_pager(
+        # Keyset or OFFSET page
+        reservations, pager, keyset = self._get_library_page(
+            Reservation, domain, order,
             url="/my/reservations",
             url_args={'sortby': sortby, 'filterby': filterby},
-            total=reservation_count,
             page=page,
-            step=self._items_per_page
-        )
-
-        # Get reservations
-        reservations = Reservation.search(
-            domain,
-            order=order,
-            limit=self._items_per_page,
-            offset=pager['offset']
+            cursor=cursor,
         )
 
         values.update({
             'reservations': reservations,
             'page_name': 'reservation',
             'pager': pager,
+            'keyset': keyset,
             'default_url': '/my/reservations',
             'searchbar_sortings': searchbar_sortings,
             'searchbar_filters': searchbar_filters,
@@ -382,7 +391,7 @@ class LibraryPortal(CustomerPortal):
 
     @http.route(['/my/resource-requests', '/my/resource-requests/page/<int:page>'],
                 type='http', auth="user", website=True)
-    def portal_my_resource_requests(self, page=1, sortby=None, filterby=None, **kw):
+    def portal_my_resource_requests(self, page=1, sortby=None, filterby=None, cursor=None, **kw):
         """Danh sách yêu cầu bổ sung tài liệu của tôi"""
 
         values = self._prepare_portal_layout_values()
@@ -415,30 +424,20 @@ class LibraryPortal(CustomerPortal):
             sortby = 'date'
         order = searchbar_sortings[sortby]['order']
 
-        # Count
-        request_count = ResourceRequest.search_count(domain)
-
-        # Pager
-        pager = portal_pager(
+        # Keyset or OFFSET page
+        requests, pager, keyset = self._get_library_page(
+            ResourceRequest, domain, order,
             url="/my/resource-requests",
             url_args={'sortby': sortby, 'filterby': filterby},
-            total=request_count,
             page=page,
-            step=self._items_per_page
-        )
-
-        # Get requests
-        requests = ResourceRequest.search(
-            domain,
-            order=order,
-            limit=self._items_per_page,
-            offset=pager['offset']
+            cursor=cursor,
         )
 
         values.update({
             'requests': requests,
             'page_name': 'resource_request',
             'pager': pager,
+            'keyset': keyset,
             'default_url': '/my/resource-requests',
             'searchbar_sortings': searchbar_sortings,
             'searchbar_filters': searchbar_filters,
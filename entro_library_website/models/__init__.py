@@ -1,7 +1,11 @@
 from . import library_website_category
 from . import library_website_slider
+from . import website
+from . import library_borrower_visibility_mixin
+from . import library_borrower_type
 from . import library_book
 from . import library_media
+from . import library_media_playlist
 from . import res_partner
 from . import google_analytics_config
 from . import library_resource_request
@@ -5,7 +5,11 @@ import unicodedata
 
 
 class LibraryBook(models.Model):
-    _inherit = 'library.book'
+    _inherit = ['library.book', 'library.borrower.visibility.mixin']
+    _name = 'library.book'
+
+    # Fields shown on the homepage, writing them invalidates its cache
+    _library_home_fields = {'active', 'website_published', 'name', 'author_ids', 'image_1920'}
 
     # Website category
     website_category_id = fields.Many2one(
@@ -24,6 +28,16 @@ class LibraryBook(models.Model):
         string='Loại độc giả được phép',
         help='Chỉ những loại độc giả này mới được xem sách trên website. Để trống nếu cho phép tất cả.'
     )
+    visible_borrower_type_ids = fields.Many2many(
+        'library.borrower.type',
+        'library_book_borrower_type_visible_rel',
+        'book_id',
+        'borrower_type_id',
+        string='Loại độc giả được xem',
+        compute='_compute_visible_borrower_type_ids',
+        store=True,
+        help='Các loại độc giả được xem sách trên website (tất cả nếu không giới hạn)'
+    )
 
     # Website visibility
     website_published = fields.Boolean(
@@ -69,6 +83,26 @@ class LibraryBook(models.Model):
         for book in self:
             book.is_published = book.website_published and book.active
 
+    def _get_facet_fields(self):
+        return dict(super()._get_facet_fields(), website_category='website_category_id')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['website']._invalidate_library_home_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._library_home_fields.intersection(vals):
+            self.env['website']._invalidate_library_home_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['website']._invalidate_library_home_cache()
+        return res
+
     def _get_vietnamese_slug(self, text):
         """Convert Vietnamese text to URL-friendly slug"""
         if not text:
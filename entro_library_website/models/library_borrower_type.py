@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+
+class LibraryBorrowerType(models.Model):
+    _inherit = 'library.borrower.type'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        borrower_types = super().create(vals_list)
+        # New types can see every unrestricted book and media
+        for model_name in ('library.book', 'library.media'):
+            self.env[model_name]._recompute_unrestricted_visibility()
+        return borrower_types
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models
+
+
+class LibraryBorrowerVisibilityMixin(models.AbstractModel):
+    """Website visibility of catalog records per borrower type.
+
+    ``allowed_borrower_type_ids`` (empty means everyone) is denormalized into
+    the stored ``visible_borrower_type_ids``, which lists every borrower type
+    allowed to see the record. Filtering a listing for a member is then a
+    single lookup on the relation table instead of an OR between an emptiness
+    test and a membership test. Inheriting models declare both fields.
+    """
+
+    _name = 'library.borrower.visibility.mixin'
+    _description = 'Hiển thị theo loại độc giả'
+
+    @api.depends('allowed_borrower_type_ids')
+    def _compute_visible_borrower_type_ids(self):
+        all_types = self.env['library.borrower.type'].with_context(active_test=False).search([])
+        for record in self:
+            record.visible_borrower_type_ids = record.allowed_borrower_type_ids or all_types
+
+    @api.model
+    def _get_website_access_domain(self):
+        """Domain of the records the current website user may see"""
+        user = self.env.user
+        if user._is_public():
+            return []
+        borrower_type = user.partner_id.borrower_type_id
+        if not borrower_type:
+            return []
+        return [('visible_borrower_type_ids', 'in', borrower_type.id)]
+
+    def _is_website_accessible(self):
+        """Whether the current website user may see ``self``"""
+        self.ensure_one()
+        user = self.env.user
+        if user._is_public():
+            return True
+        borrower_type = user.partner_id.borrower_type_id
+        return not borrower_type or borrower_type in self.visible_borrower_type_ids
+
+    @api.model
+    def _recompute_unrestricted_visibility(self):
+        """Unrestricted records are visible to every borrower type, refresh
+        them when the set of borrower types changes"""
+        records = self.with_context(active_test=False).search([('allowed_borrower_type_ids', '=', False)])
+        self.env.add_to_compute(self._fields['visible_borrower_type_ids'], records)
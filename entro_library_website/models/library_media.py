@@ -4,9 +4,12 @@ from odoo import models, fields, api
 
 class LibraryMedia(models.Model):
     _inherit = ['library.media', 'website.seo.metadata',
-                'website.published.mixin']
+                'website.published.mixin', 'library.borrower.visibility.mixin']
     _name = 'library.media'
 
+    # Fields shown on the homepage, writing them invalidates its cache
+    _library_home_fields = {'active', 'website_published', 'name', 'thumbnail'}
+
     # Website Publishing
     website_published = fields.Boolean(
         'Xuất bản trên Website', default=False, copy=False)
@@ -31,6 +34,16 @@ class LibraryMedia(models.Model):
         string='Loại độc giả được phép',
         help='Chỉ những loại độc giả này mới được xem tài liệu trên website. Để trống nếu cho phép tất cả.'
     )
+    visible_borrower_type_ids = fields.Many2many(
+        'library.borrower.type',
+        'library_media_borrower_type_visible_rel',
+        'media_id',
+        'borrower_type_id',
+        string='Loại độc giả được xem',
+        compute='_compute_visible_borrower_type_ids',
+        store=True,
+        help='Các loại độc giả được xem tài liệu trên website (tất cả nếu không giới hạn)'
+    )
 
     @api.depends('name')
     def _compute_website_url(self):
@@ -40,6 +53,32 @@ class LibraryMedia(models.Model):
             else:
                 media.website_url = False
 
+    @api.model
+    def _get_website_access_domain(self):
+        # Public visitors only see public media, members also see members-only
+        access_levels = ['public'] if self.env.user._is_public() else ['public', 'members']
+        return super()._get_website_access_domain() + [('access_level', 'in', access_levels)]
+
+    def _get_facet_fields(self):
+        return dict(super()._get_facet_fields(), website_category='website_category_id')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['website']._invalidate_library_home_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._library_home_fields.intersection(vals):
+            self.env['website']._invalidate_library_home_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['website']._invalidate_library_home_cache()
+        return res
+
     def _prepare_meta_tags(self):
         """Prepare meta tags for SEO"""
         self.ensure_one()
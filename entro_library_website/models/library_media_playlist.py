@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+
+class LibraryMediaPlaylist(models.Model):
+    _inherit = 'library.media.playlist'
+
+    published_media_count = fields.Integer(
+        string='Số phương tiện đã đăng',
+        compute='_compute_published_media_count',
+        store=True
+    )
+
+    @api.depends('media_ids', 'media_ids.website_published', 'media_ids.active')
+    def _compute_published_media_count(self):
+        """Same grouped query as ``_compute_media_stats``, restricted to
+        published media"""
+        saved = self.filtered(lambda playlist: isinstance(playlist.id, int))
+        counts = {}
+        if saved:
+            counts = {
+                playlist.id: count
+                for playlist, count in self.env['library.media'].sudo()._read_group(
+                    [('playlist_ids', 'in', saved.ids), ('website_published', '=', True)],
+                    groupby=['playlist_ids'],
+                    aggregates=['__count'],
+                )
+            }
+        for playlist in saved:
+            playlist.published_media_count = counts.get(playlist.id, 0)
+        for playlist in self - saved:
+            playlist.published_media_count = len(playlist.media_ids.filtered('website_published'))
@@ -36,3 +36,19 @@ class LibraryWebsiteSlider(models.Model):
     # Status
     active = fields.Boolean(string='Active', default=True)
     is_published = fields.Boolean(string='Published', default=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['website']._invalidate_library_home_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['website']._invalidate_library_home_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['website']._invalidate_library_home_cache()
+        return res
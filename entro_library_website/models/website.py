@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import time
+
+from odoo import models, tools
+
+from odoo.addons.entro_library.utils.cache_generation import (
+    bump_cache_generation, ensure_cache_generation, get_cache_generation,
+)
+
+HOME_CACHE_GENERATION = 'library_home_cache_generation'
+
+
+class Website(models.Model):
+    _inherit = 'website'
+
+    def init(self):
+        super().init()
+        ensure_cache_generation(self.env.cr, HOME_CACHE_GENERATION)
+
+    def _get_library_home_values(self):
+        """Statistics and carousels of the library homepage.
+
+        The record ids and counters are cached per website, language, media
+        access levels and borrower type for ``library.home_cache_ttl`` seconds
+        (system parameter, default 60, 0 disables the cache). Writes on books,
+        media and sliders move the cache to a new generation.
+        """
+        self.ensure_one()
+        try:
+            ttl = int(self.env['ir.config_parameter'].sudo().get_param(
+                'library.home_cache_ttl', default=60
+            ))
+        except (ValueError, TypeError):
+            ttl = 60
+
+        user = self.env.user
+        # Visitors and portal members only see public media (record rule),
+        # as for the website listings the borrower type restricts the catalog
+        access_levels = ('public',) if user.share else ('public', 'members')
+        borrower_type_id = not user._is_public() and user.partner_id.borrower_type_id.id
+        if ttl > 0:
+            data = self._get_library_home_data(
+                self.env.lang, access_levels, borrower_type_id, int(time.time() // ttl),
+                get_cache_generation(self.env.cr, HOME_CACHE_GENERATION),
+            )
+        else:
+            data = self._compute_library_home_data(access_levels, borrower_type_id)
+
+        return {
+            'hero_slides': self.env['library.website.slider'].browse(data['hero_slide_ids']),
+            'popular_books': self.env['library.book'].browse(data['popular_book_ids']),
+            'popular_media': self.env['library.media'].browse(data['popular_media_ids']),
+            'blog_posts': self.env['blog.post'].browse(data['blog_post_ids']),
+            'total_books': data['total_books'],
+            'total_media': data['total_media'],
+            'total_members': data['total_members'],
+            'visitor_count': data['visitor_count'],
+        }
+
+    @tools.ormcache('self.id', 'lang', 'access_levels', 'borrower_type_id', 'time_bucket', 'generation')
+    def _get_library_home_data(self, lang, access_levels, borrower_type_id, time_bucket, generation):
+        # lang, time_bucket and generation are only part of the cache key
+        return self._compute_library_home_data(access_levels, borrower_type_id)
+
+    def _compute_library_home_data(self, access_levels, borrower_type_id):
+        """Run the homepage queries, only ids and counters are returned.
+
+        The catalog queries run as superuser with the visibility filters
+        given explicitly, so the result only depends on the cache key and not
+        on the record rules of the user who filled the cache.
+        """
+        visibility_domain = [('visible_borrower_type_ids', 'in', borrower_type_id)] if borrower_type_id else []
+        book_domain = [
+            ('website_published', '=', True),
+            ('active', '=', True),
+            *visibility_domain,
+        ]
+        media_domain = [
+            ('website_published', '=', True),
+            ('active', '=', True),
+            ('access_level', 'in', access_levels),
+            *visibility_domain,
+        ]
+
+        # Get hero slides
+        hero_slides = self.env['library.website.slider'].search([
+            ('active', '=', True),
+            ('is_published', '=', True)
+        ], order='sequence, id')
+
+        # Get popular books (most borrowed) from the materialized ranking
+        popularity = self.env['library.book.popularity'].sudo()._get_popular(
+            limit=10,
+            book_domain=book_domain,
+        )
+
+        # Get popular media (most viewed last week, all time views if none)
+        popular_media = self.env['library.media.view.stat'].sudo()._get_trending(
+            days=7, limit=10, media_domain=media_domain,
+        )
+        if not popular_media:
+            popular_media = self.env['library.media'].sudo().search(media_domain, limit=10, order='view_count desc')
+
+        # Get recent blog posts
+        blog_posts = self.env['blog.post'].search([
+            ('website_published', '=', True)
+        ], limit=3, order='published_date desc')
+
+        # Get visitor count from Google Analytics (cached value)
+        try:
+            # Get cached value from system parameter (updated by scheduled action)
+            visitor_count = int(self.env['ir.config_parameter'].sudo().get_param(
+                'library.visitor_count', default=0
+            ))
+        except (ValueError, TypeError):
+            visitor_count = 0
+
+        return {
+            'hero_slide_ids': tuple(hero_slides.ids),
+            'popular_book_ids': tuple(popularity.book_id.ids),
+            'popular_media_ids': tuple(popular_media.ids),
+            'blog_post_ids': tuple(blog_posts.ids),
+            'total_books': self.env['library.book'].sudo().search_count(book_domain),
+            'total_media': self.env['library.media'].sudo().search_count(media_domain),
+            'total_members': self.env['res.partner'].sudo().search_count([('borrower_type_id', '!=', False)]),
+            'visitor_count': visitor_count,
+        }
+
+    def _invalidate_library_home_cache(self):
+        """Drop the cached homepage data in every worker, the rest of the
+        ormcache is kept"""
+        bump_cache_generation(self.env, HOME_CACHE_GENERATION)
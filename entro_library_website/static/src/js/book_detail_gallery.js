@@ -53,7 +53,7 @@ publicWidget.registry.BookDetailGallery = publicWidget.Widget.extend({
 
     _updateMainImage: function (index) {
         const $galleryItem = this.$(`#lightgallery-item-${index}`);
-        const newSrc = $galleryItem.attr('href');
+        const newSrc = $galleryItem.data('main-src') || $galleryItem.attr('href');
 
         if (newSrc) {
             this.$('#main-book-image').attr('src', newSrc);
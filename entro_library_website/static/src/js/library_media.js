@@ -24,9 +24,22 @@ publicWidget.registry.LibraryMedia = publicWidget.Widget.extend({
         // Initialize PDF viewer handling for mobile
         this._initPDFViewer();
 
+        // Count the view, the detail page itself is cacheable
+        this._logView();
+
         return this._super.apply(this, arguments);
     },
 
+    /**
+     * Count a view of the displayed media
+     */
+    _logView: function () {
+        const mediaId = this.el.classList.contains('js_library_media_detail') && this.el.dataset.mediaId;
+        if (mediaId && navigator.sendBeacon) {
+            navigator.sendBeacon(`/media/${mediaId}/luot-xem`);
+        }
+    },
+
     /**
      * Initialize lightGallery for image viewing
      */